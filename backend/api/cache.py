@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import Follow, Tag
+
+VERSION_KEY = 'version:{}'
+TAG_MAP_KEY = 'tag-map:{}'
+FEED_VERSION = 'feed'
+USER_STATE_VERSION = 'user-state:{}'
+AUTHOR_VERSION = 'author:{}'
+FOLLOW_GRAPH_KEY = 'follow-graph:{}:{}'
+
+
+def get_version(name):
+    """Версия набора данных 'name', общая для всех процессов.
+
+    Версия - случайный токен, а не счётчик: после очистки кеша
+    она не может совпасть ни с одной из выданных ранее."""
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        version = uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(name):
+    cache.set(VERSION_KEY.format(name), uuid4().hex, None)
+
+
+def get_reference_version(model):
+    """Версия справочных данных модели (теги, продукты)."""
+    return get_version(model._meta.label_lower)
+
+
+def bump_reference_version(model):
+    bump_version(model._meta.label_lower)
+
+
+def get_user_state_version(user_id):
+    """Версия избранного, списка покупок и подписок пользователя."""
+    return get_version(USER_STATE_VERSION.format(user_id))
+
+
+def bump_user_state_version(user_id):
+    bump_version(USER_STATE_VERSION.format(user_id))
+
+
+def get_author_version(user_id):
+    """Версия данных автора, которые встроены в рецепты."""
+    return get_version(AUTHOR_VERSION.format(user_id))
+
+
+def bump_author_version(user_id):
+    bump_version(AUTHOR_VERSION.format(user_id))
+
+
+def get_tag_map():
+    """Словарь slug -> id всех тегов, кешируется до изменения тегов,
+    но не дольше TAG_MAP_CACHE_TTL: так теги, изменённые в обход
+    сигналов, со временем тоже попадут в словарь."""
+    key = TAG_MAP_KEY.format(get_reference_version(Tag))
+    tag_map = cache.get(key)
+    if tag_map is None:
+        tag_map = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_map, settings.TAG_MAP_CACHE_TTL)
+    return tag_map
+
+
+class FollowGraphCache:
+    """Кеш подписок: id подписчика -> множество id авторов.
+
+    Записи живут не дольше 'ttl' секунд, при превышении 'maxsize'
+    вытесняются давно не использованные (LRU). При промахе множество
+    ищется в общем кеше Django и только затем загружается из базы.
+
+    Записи привязаны к версии состояния пользователя, которую
+    сигналы Follow меняют при любом изменении подписок (в том числе
+    из админки и в других процессах), поэтому устаревшая запись
+    не используется."""
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def _get_entry(self, user_id, version):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires, entry_version, followings = entry
+        if expires < monotonic() or entry_version != version:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return followings
+
+    def get(self, user_id):
+        """Возвращает множество id авторов, на которых подписан
+        пользователь, при промахе загружает его одним запросом."""
+        version = get_user_state_version(user_id)
+        with self._lock:
+            followings = self._get_entry(user_id, version)
+        if followings is not None:
+            return followings
+        key = FOLLOW_GRAPH_KEY.format(user_id, version)
+        followings = cache.get(key)
+        if followings is None:
+            followings = frozenset(
+                Follow.objects.filter(
+                    user_id=user_id
+                ).values_list('following_id', flat=True)
+            )
+            cache.set(key, followings, self.ttl)
+        with self._lock:
+            self._entries[user_id] = (
+                monotonic() + self.ttl, version, followings
+            )
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return followings
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+follow_graph = FollowGraphCache(
+    ttl=settings.FOLLOW_GRAPH_CACHE_TTL,
+    maxsize=settings.FOLLOW_GRAPH_CACHE_SIZE,
+)
@@ -0,0 +1,111 @@
+import binascii
+from base64 import b64decode
+from tempfile import SpooledTemporaryFile
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+from rest_framework import serializers
+
+BASE64_HEADER = ';base64,'
+BASE64_CHUNK_SIZE = 64 * 1024
+BASE64_FILE_NAME = 'image'
+IMAGE_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+class StreamingImageField(serializers.FileField):
+    """Картинка строкой base64 (с заголовком data:URI или без него)
+    или файлом из multipart-запроса.
+
+    base64 декодируется частями во временный файл, который держится
+    в памяти только до FILE_UPLOAD_MAX_MEMORY_SIZE, а затем
+    переносится на диск. Pillow проверяет картинку по файлу,
+    не читая её в память целиком."""
+
+    default_error_messages = {
+        'invalid_image': serializers.ImageField.default_error_messages[
+            'invalid_image'
+        ],
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = self.decode_base64(data)
+        return self.verify_image(super().to_internal_value(data))
+
+    def decode_base64(self, data):
+        start = data.find(BASE64_HEADER)
+        start = 0 if start == -1 else start + len(BASE64_HEADER)
+        file = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        tail = ''
+        try:
+            for position in range(start, len(data), BASE64_CHUNK_SIZE):
+                chunk = tail + ''.join(
+                    data[position:position + BASE64_CHUNK_SIZE].split()
+                )
+                end = len(chunk) - len(chunk) % 4
+                file.write(b64decode(chunk[:end], validate=True))
+                tail = chunk[end:]
+        except (binascii.Error, ValueError):
+            file.close()
+            self.fail('invalid_image')
+        if tail:
+            file.close()
+            self.fail('invalid_image')
+        size = file.tell()
+        file.seek(0)
+        return UploadedFile(file, name=BASE64_FILE_NAME, size=size)
+
+    def verify_image(self, file):
+        try:
+            image = Image.open(file)
+            image.verify()
+        except Exception:
+            self.fail('invalid_image')
+        if image.format not in IMAGE_EXTENSIONS:
+            self.fail('invalid_image')
+        file.seek(0)
+        file.name = f'{uuid4()}.{IMAGE_EXTENSIONS[image.format]}'
+        file.content_type = Image.MIME.get(image.format)
+        return file
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Первичный ключ связанного объекта, который ищется среди объектов,
+    заранее загруженных корневым сериализатором в 'related_objects'
+    вида {модель: {pk: объект}}, а не отдельным запросом.
+
+    Ошибки те же, что у PrimaryKeyRelatedField."""
+
+    def to_internal_value(self, data):
+        model = self.get_queryset().model
+        objects = getattr(self.root, 'related_objects', {}).get(model)
+        if objects is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = model._meta.pk.to_python(data)
+        except ValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in objects:
+            self.fail('does_not_exist', pk_value=data)
+        return objects[pk]
+
+
+def load_related_objects(model, pks):
+    """Загружает одним запросом объекты 'model' с первичными ключами
+    'pks', пропуская значения, которые ключами быть не могут."""
+    valid_pks = set()
+    for pk in pks:
+        if isinstance(pk, bool):
+            continue
+        try:
+            valid_pks.add(model._meta.pk.to_python(pk))
+        except ValidationError:
+            continue
+    return model.objects.in_bulk(valid_pks)
@@ -1,32 +1,46 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connections
+from django.db.models import Exists, OuterRef, Q
 from django_filters import rest_framework
-from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe
+from api.cache import get_tag_map
+from recipes.models import RECIPE_SEARCH_CONFIG, Recipe, RecipeTag
 
 User = get_user_model()
 
 
-class IngredientSearchFilter(SearchFilter):
-    search_param = 'name'
-
-
 class FilterOfRecipe(rest_framework.FilterSet):
     author = rest_framework.ModelChoiceFilter(
         queryset=User.objects.all()
     )
-    tags = rest_framework.AllValuesMultipleFilter(
-        field_name='tags__slug'
+    tags = rest_framework.MultipleChoiceFilter(
+        choices=lambda: [(slug, slug) for slug in get_tag_map()],
+        method='filter_tags'
     )
     is_favorited = rest_framework.BooleanFilter(
         method='filter_is_favorited'
     )
     is_in_shopping_cart = rest_framework.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    search = rest_framework.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author', 'tags', 'is_favorited', 'is_in_shopping_cart', 'search'
+        )
+
+    def filter_tags(self, queryset, name, slugs):
+        """Рецепты хотя бы с одним из тегов. Фильтрует подзапросом
+        по id тегов, поэтому строки рецептов не дублируются.
+        Теги, удалённые после проверки параметра, пропускаются."""
+        tag_map = get_tag_map()
+        return queryset.filter(Exists(RecipeTag.objects.filter(
+            recipe=OuterRef('pk'),
+            tag_id__in=[tag_map[slug] for slug in slugs if slug in tag_map]
+        )))
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
@@ -37,3 +51,32 @@ class FilterOfRecipe(rest_framework.FilterSet):
         if value and self.request.user.is_authenticated:
             return queryset.filter(shoplists__user=self.request.user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию рецепта.
+
+        На PostgreSQL использует GIN-индекс по 'to_tsvector' и сортирует
+        по релевантности, на SQLite ищет вхождение подстроки."""
+        if connections[queryset.db].vendor != 'postgresql':
+            return queryset.filter(
+                Q(name__icontains=value) | Q(text__icontains=value)
+            )
+        query = SearchQuery(
+            value, config=RECIPE_SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.alias(
+            search_vector=SearchVector(
+                'name', 'text', config=RECIPE_SEARCH_CONFIG
+            )
+        ).annotate(
+            rank=SearchRank(
+                SearchVector(
+                    'name', config=RECIPE_SEARCH_CONFIG, weight='A'
+                ) + SearchVector(
+                    'text', config=RECIPE_SEARCH_CONFIG, weight='B'
+                ),
+                query
+            )
+        ).filter(
+            search_vector=query
+        ).order_by('-rank', *Recipe._meta.ordering)
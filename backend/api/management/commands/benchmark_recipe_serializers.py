@@ -0,0 +1,51 @@
+from timeit import repeat
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.serializers import RecipeReadSerializer, RecipeSerializer
+from api.views import RECIPE_LIST_IMAGE_SIZE, RecipeViewSet
+
+SIZES = (6, 50, 500)
+SERIALIZERS = (RecipeSerializer, RecipeReadSerializer)
+ROW = '{:>6} {:>20} {:>22}'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время сериализации первых рецептов базы '
+            'сериализаторами RecipeSerializer и RecipeReadSerializer.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('sizes', nargs='*', type=int, default=SIZES)
+        parser.add_argument('--number', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def measure(self, serializer_class, recipes, context, options):
+        """Лучшее время одной сериализации в миллисекундах."""
+        return min(repeat(
+            lambda: serializer_class(
+                recipes, many=True, context=context
+            ).data,
+            number=options['number'],
+            repeat=options['repeat']
+        )) / options['number'] * 1000
+
+    def handle(self, *args, **options):
+        context = {
+            'request': Request(APIRequestFactory().get(
+                '/api/recipes/', SERVER_NAME=settings.ALLOWED_HOSTS[0]
+            )),
+            'image_size': RECIPE_LIST_IMAGE_SIZE,
+        }
+        print(ROW.format('N', 'RecipeSerializer', 'RecipeReadSerializer'))
+        for size in options['sizes']:
+            recipes = list(RecipeViewSet().get_queryset()[:size])
+            times = [
+                self.measure(serializer_class, recipes, context, options)
+                for serializer_class in SERIALIZERS
+            ]
+            print(ROW.format(
+                len(recipes), *(f'{time:.2f} ms' for time in times)
+            ))
@@ -0,0 +1,62 @@
+from timeit import repeat
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import FastJSONRenderer
+from api.serializers import IngredientSerializer, RecipeReadSerializer
+from api.views import RECIPE_LIST_IMAGE_SIZE, RecipeViewSet
+from recipes.models import Ingredient
+
+RENDERERS = (JSONRenderer, FastJSONRenderer)
+ROW = '{:<20} {:>24} {:>24}'
+RESULT = '{:.2f} ms ({:.0f} MB/s)'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает скорость JSONRenderer и FastJSONRenderer '
+            'на списке продуктов и первых рецептах базы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--number', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def measure(self, renderer_class, data, options):
+        """Лучшее время одного рендеринга в миллисекундах
+        и скорость в мегабайтах в секунду."""
+        renderer = renderer_class()
+        size = len(renderer.render(data))
+        time = min(repeat(
+            lambda: renderer.render(data),
+            number=options['number'],
+            repeat=options['repeat']
+        )) / options['number']
+        return time * 1000, size / time / 2 ** 20
+
+    def handle(self, *args, **options):
+        context = {
+            'request': Request(APIRequestFactory().get(
+                '/api/recipes/', SERVER_NAME=settings.ALLOWED_HOSTS[0]
+            )),
+            'image_size': RECIPE_LIST_IMAGE_SIZE,
+        }
+        payloads = (
+            ('Продукты', IngredientSerializer(
+                Ingredient.objects.all(), many=True
+            ).data),
+            ('Рецепты', RecipeReadSerializer(
+                RecipeViewSet().get_queryset()[:options['recipes']],
+                many=True,
+                context=context
+            ).data),
+        )
+        print(ROW.format('', *(renderer.__name__ for renderer in RENDERERS)))
+        for name, data in payloads:
+            print(ROW.format(f'{name}, {len(data)}', *(
+                RESULT.format(*self.measure(renderer, data, options))
+                for renderer in RENDERERS
+            )))
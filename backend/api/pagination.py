@@ -0,0 +1,117 @@
+from functools import partial
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+COUNT_CACHE_KEY = 'pagination-count:{}:{}'
+RELTUPLES_SQL = 'SELECT reltuples FROM pg_class WHERE oid = %s::regclass'
+
+
+class CachedCountPage(Page):
+    """Страница, которая знает о следующей по лишней выбранной строке,
+    а не по числу объектов."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator с кешируемым подсчётом объектов.
+
+    Ключом кеша служит SQL-запрос выборки, то есть набор фильтров
+    вместе с их значениями. Для больших таблиц без фильтров
+    на PostgreSQL число строк берётся из статистики 'reltuples'.
+    'version' - версия данных выборки: после её смены число
+    считается заново.
+
+    Число объектов может отставать от базы, поэтому страница
+    не обрезается по нему: выбирается 'per_page' + 1 строк от начала
+    страницы, а поле 'count' поправляется по тому, что нашлось."""
+
+    def __init__(self, object_list, per_page, version=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.version = version
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('Страница пуста.')
+        has_next = len(rows) > self.per_page
+        if has_next:
+            self.count = max(self.count, bottom + len(rows))
+        else:
+            self.count = bottom + len(rows)
+        self.__dict__.pop('num_pages', None)
+        return CachedCountPage(rows[:self.per_page], number, self, has_next)
+
+    def estimate_count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if queryset.query.where or connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(RELTUPLES_SQL, [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        if row is None or row[0] < settings.PAGINATION_COUNT_ESTIMATE_FROM:
+            return None
+        return int(row[0])
+
+    @cached_property
+    def count(self):
+        try:
+            sql = str(self.object_list.query)
+        except EmptyResultSet:
+            return 0
+        key = COUNT_CACHE_KEY.format(
+            self.version, md5(sql.encode()).hexdigest()
+        )
+        count = cache.get(key)
+        if count is None:
+            count = self.estimate_count()
+            if count is None:
+                count = super().count
+            cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TTL)
+        return count
+
+
+class CachedCountPagination(PageNumberPagination):
+    """Постраничная пагинация с кешированием поля 'count'.
+
+    Версию данных для ключа кеша даёт метод 'get_count_version'
+    представления, если он есть."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        get_count_version = getattr(view, 'get_count_version', None)
+        self.django_paginator_class = partial(
+            CachedCountPaginator,
+            version=get_count_version and get_count_version()
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Пагинация ленты рецептов по курсору (pub_date, id).
+
+    Включается параметром '?pagination=cursor': глубокие страницы
+    не требуют OFFSET и подсчёта общего числа рецептов."""
+    ordering = ('-pub_date', '-id')
@@ -0,0 +1,39 @@
+import json
+
+from rest_framework import exceptions, parsers
+
+MULTIPART_DATA_FIELD = 'data'
+
+
+class MultiPartJSONParser(parsers.MultiPartParser):
+    """multipart/form-data, где поля передаются JSON-объектом в части
+    'data', а файлы - отдельными частями (например, 'image').
+
+    Django сохраняет большие файлы на диск по мере чтения запроса,
+    поэтому картинка не держится в памяти целиком."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        result = super().parse(stream, media_type, parser_context)
+        try:
+            data = json.loads(result.data.get(MULTIPART_DATA_FIELD, '{}'))
+        except ValueError as error:
+            raise exceptions.ParseError(
+                f'Часть "{MULTIPART_DATA_FIELD}" должна быть JSON: {error}'
+            )
+        if not isinstance(data, dict):
+            raise exceptions.ParseError(
+                f'Часть "{MULTIPART_DATA_FIELD}" должна быть JSON-объектом.'
+            )
+        data.update(result.files.items())
+        return data
+
+
+class JSONLinesParser(parsers.BaseParser):
+    """JSON Lines: отдаёт итератор по строкам тела запроса,
+    которые читаются по мере разбора."""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return iter(())
+        return iter(stream.readline, b'')
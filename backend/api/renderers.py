@@ -0,0 +1,81 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Те же замены, что делает JSONRenderer для совместимости с JavaScript.
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+def contains_float(value):
+    """Есть ли float среди значений словаря или элементов списка
+    'value', включая вложенные."""
+    if isinstance(value, dict):
+        value = value.values()
+    for item in value:
+        item_type = type(item)
+        if item_type in (str, int, bool) or item is None:
+            continue
+        if item_type is float:
+            return True
+        if isinstance(item, (dict, list, tuple)) and contains_float(item):
+            return True
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON-рендерер на orjson с тем же результатом, что у JSONRenderer.
+
+    Даты, время, Decimal, ленивые строки и прочие типы, которые orjson
+    не знает или пишет иначе, кодируются кодировщиком DRF. Без orjson,
+    для ответов с отступами ('indent') и при UNICODE_JSON или
+    COMPACT_JSON, выключенных в настройках, работает JSONRenderer.
+
+    Он же рендерит данные, которые orjson записал бы иначе: с float
+    (другая запись 1e+16 и 1e-05, NaN и Infinity вместо ошибки
+    STRICT_JSON), с целыми длиннее 53 бит и с нестроковыми ключами."""
+
+    encoder = encoders.JSONEncoder()
+
+    def default(self, obj):
+        value = self.encoder.default(obj)
+        if type(value) is float or (
+            isinstance(value, (dict, list, tuple)) and contains_float(value)
+        ):
+            raise TypeError('float кодируется JSONRenderer.')
+        return value
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type or '',
+                                   renderer_context or {})
+                or type(data) is float
+                or isinstance(data, (dict, list, tuple))
+                and contains_float(data)):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        if data is None:
+            return b''
+        try:
+            content = orjson.dumps(
+                data,
+                default=self.default,
+                option=(
+                    orjson.OPT_PASSTHROUGH_DATETIME
+                    | orjson.OPT_STRICT_INTEGER
+                )
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        for separator, escaped in LINE_SEPARATORS:
+            content = content.replace(separator, escaped)
+        return content
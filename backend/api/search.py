@@ -0,0 +1,53 @@
+from bisect import bisect_left
+from threading import Lock
+
+from api.cache import get_reference_version
+from recipes.models import Ingredient
+
+
+def normalize(text):
+    """Приводит строку к виду для сравнения: без учёта регистра и 'ё'."""
+    return text.casefold().replace('ё', 'е')
+
+
+class IngredientPrefixIndex:
+    """Индекс продуктов для поиска по началу названия.
+
+    Справочник продуктов хранится в памяти процесса отсортированным
+    по нормализованному названию, поиск выполняется бинарным поиском.
+    Индекс строится при первом обращении и перестраивается после
+    изменения версии справочника."""
+
+    def __init__(self):
+        self._keys = []
+        self._rows = []
+        self._version = None
+        self._lock = Lock()
+
+    def build(self, version):
+        rows = sorted(
+            Ingredient.objects.values('id', 'name', 'measurement_unit'),
+            key=lambda row: (normalize(row['name']), row['name'], row['id'])
+        )
+        with self._lock:
+            self._keys = [normalize(row['name']) for row in rows]
+            self._rows = rows
+            self._version = version
+
+    def search(self, prefix, limit):
+        version = get_reference_version(Ingredient)
+        if version != self._version:
+            self.build(version)
+        prefix = normalize(prefix)
+        with self._lock:
+            keys, rows = self._keys, self._rows
+        found = []
+        index = bisect_left(keys, prefix)
+        while (index < len(keys) and len(found) < limit
+               and keys[index].startswith(prefix)):
+            found.append(rows[index])
+            index += 1
+        return found
+
+
+ingredient_index = IngredientPrefixIndex()
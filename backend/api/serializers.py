@@ -1,12 +1,55 @@
 from collections import Counter
+from collections.abc import Mapping
 
 import webcolors
 from django.core.validators import MinValueValidator
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import exceptions, serializers
 
-from recipes.models import (Favorite, Follow, Ingredient, IngredientRecipe,
-                            Recipe, Shoplist, Tag, User)
+from api.fields import (BulkPrimaryKeyRelatedField, StreamingImageField,
+                        load_related_objects)
+from api.utils import (get_followings, get_recipe_collection,
+                       get_recipes_limit)
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            Shoplist, ShoplistIngredient, Tag, User)
+
+
+def recipe_lookups():
+    """Связанные объекты, которые читает RecipeSerializer (кроме
+    автора): с ними число запросов не зависит от числа рецептов
+    и продуктов."""
+    return (
+        'tags',
+        Prefetch(
+            'amounts',
+            queryset=IngredientRecipe.objects.select_related('ingredient')
+        ),
+    )
+
+
+class RecipeImageField(serializers.ImageField):
+    """Ссылка на картинку рецепта нужного размера.
+
+    Размер задаётся при объявлении поля, иначе берётся из контекста
+    ('image_size'); без размера отдаётся сама картинка."""
+
+    def __init__(self, size=None, **kwargs):
+        self.size = size
+        kwargs['read_only'] = True
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        url = recipe.image.storage.url(
+            recipe.image_name(self.size or self.context.get('image_size'))
+        )
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
 
 
 class CommonUserSerializer(serializers.ModelSerializer):
@@ -24,13 +67,13 @@ class CommonUserSerializer(serializers.ModelSerializer):
         request = self.context['request']
         if request.user.is_anonymous:
             return False
-        return Follow.objects.filter(
-            user=request.user, following=following
-        ).exists()
+        return following.id in get_followings(request)
 
 
 class LittleRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор краткой информации по рецепту."""
+    image = RecipeImageField(size='small')
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
@@ -41,7 +84,7 @@ class FollowUserSerializer(CommonUserSerializer):
     на которого подписался пользователь."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(source='recipes.count')
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta(CommonUserSerializer.Meta):
         fields = (
@@ -49,14 +92,13 @@ class FollowUserSerializer(CommonUserSerializer):
         )
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        try:
-            limit = int(request.GET.get('recipes_limit', 10**10))
-        except Exception:
-            raise exceptions.ValidationError({
-                'Введите число!'
-            })
-        recipes = obj.recipes.all()[:limit]
+        recipes_by_author = self.context.get('recipes_by_author')
+        if recipes_by_author is not None:
+            recipes = recipes_by_author.get(obj.id, [])
+        else:
+            recipes = obj.recipes.all()[
+                :get_recipes_limit(self.context['request'])
+            ]
         return LittleRecipeSerializer(recipes, many=True).data
 
 
@@ -99,7 +141,7 @@ class IngredientRecipeSerializer(serializers.ModelSerializer):
 
 class CreateUpdateRecipeIngredientsSerializer(serializers.ModelSerializer):
     """Сериализатор для внесения ингредиентов в рецепт."""
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = BulkPrimaryKeyRelatedField(queryset=Ingredient.objects.all())
     amount = serializers.IntegerField(
         validators=(
             MinValueValidator(
@@ -123,19 +165,21 @@ class RecipeSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+            'is_in_shopping_cart', 'name', 'image', 'image_status', 'text',
+            'cooking_time'
         )
 
     def recipe_in_collection(self, model, recipe):
-        user = self.context['request'].user
-        if user.is_anonymous:
+        request = self.context['request']
+        if request.user.is_anonymous:
             return False
-        return model.objects.filter(user=user, recipe=recipe).exists()
+        return recipe.id in get_recipe_collection(request, model)
 
     def get_is_favorited(self, recipe):
         return self.recipe_in_collection(Favorite, recipe)
@@ -144,14 +188,63 @@ class RecipeSerializer(serializers.ModelSerializer):
         return self.recipe_in_collection(Shoplist, recipe)
 
 
+class RecipeReadSerializer(RecipeSerializer):
+    """Сериализатор для чтения рецептов в списках и на странице рецепта.
+
+    Даёт то же представление, что и RecipeSerializer, но собирает его
+    напрямую из загруженных объектов, без обхода полей DRF. Ключи
+    и их порядок должны совпадать с RecipeSerializer.Meta.fields."""
+
+    def to_representation(self, recipe):
+        request = self.context['request']
+        author = recipe.author
+        return {
+            'id': recipe.id,
+            'tags': [
+                {
+                    'id': tag.id,
+                    'color': tag.color,
+                    'name': tag.name,
+                    'slug': tag.slug,
+                } for tag in recipe.tags.all()
+            ],
+            'author': {
+                'email': author.email,
+                'id': author.id,
+                'username': author.username,
+                'first_name': author.first_name,
+                'last_name': author.last_name,
+                'is_subscribed': (
+                    request.user.is_authenticated
+                    and author.id in get_followings(request)
+                ),
+            },
+            'ingredients': [
+                {
+                    'id': amount.ingredient.id,
+                    'name': amount.ingredient.name,
+                    'measurement_unit': amount.ingredient.measurement_unit,
+                    'amount': amount.amount,
+                } for amount in recipe.amounts.all()
+            ],
+            'is_favorited': self.get_is_favorited(recipe),
+            'is_in_shopping_cart': self.get_is_in_shopping_cart(recipe),
+            'name': recipe.name,
+            'image': self.fields['image'].to_representation(recipe),
+            'image_status': recipe.image_status,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        }
+
+
 class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания и изменения рецепта."""
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True
     )
     ingredients = CreateUpdateRecipeIngredientsSerializer(many=True)
-    image = Base64ImageField()
+    image = StreamingImageField()
     cooking_time = serializers.IntegerField(
         validators=(
             MinValueValidator(
@@ -168,6 +261,26 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             'name', 'image', 'text', 'cooking_time'
         )
 
+    def to_internal_value(self, data):
+        """Загружает все указанные теги и продукты двумя запросами
+        до проверки полей."""
+        if isinstance(data, Mapping):
+            tags = data.get('tags')
+            ingredients = data.get('ingredients')
+            self.related_objects = {
+                Tag: load_related_objects(
+                    Tag, tags if isinstance(tags, list) else ()
+                ),
+                Ingredient: load_related_objects(
+                    Ingredient,
+                    [
+                        ingredient.get('id') for ingredient in ingredients
+                        if isinstance(ingredient, Mapping)
+                    ] if isinstance(ingredients, list) else ()
+                ),
+            }
+        return super().to_internal_value(data)
+
     @staticmethod
     def unique_object(collection):
         """Вспомогательная функция для методов:
@@ -216,6 +329,7 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             ) for ingredient in ingredients
         )
 
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         tags = validated_data.pop('tags')
@@ -225,15 +339,63 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         self.create_ingredients(ingredients, recipe)
         return recipe
 
+    def update_ingredients(self, recipe, ingredients):
+        """Приводит ингредиенты рецепта к 'ingredients' по разнице
+        с текущими: добавляет новые, меняет изменившиеся меры
+        и удаляет убранные. Возвращает изменения мер добавленных
+        и изменённых продуктов вида {id продукта: изменение количества}:
+        bulk_create и bulk_update не вызывают сигналы, а удалённые
+        продукты учитывает сигнал post_delete."""
+        amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        current = {
+            row.ingredient_id: row
+            for row in IngredientRecipe.objects.select_for_update().filter(
+                recipe=recipe
+            )
+        }
+        changes = Counter(amounts)
+        changes.subtract({
+            ingredient_id: row.amount for ingredient_id, row in current.items()
+            if ingredient_id in amounts
+        })
+        IngredientRecipe.objects.filter(
+            recipe=recipe,
+            ingredient_id__in=current.keys() - amounts.keys()
+        ).delete()
+        changed_rows = []
+        for ingredient_id, row in current.items():
+            if ingredient_id in amounts and changes[ingredient_id]:
+                row.amount = amounts[ingredient_id]
+                changed_rows.append(row)
+        IngredientRecipe.objects.bulk_update(changed_rows, ('amount',))
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=amount
+            ) for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
+        )
+        return changes
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', None)
-        instance.tags.set(tags)
+        if tags is not None:
+            instance.tags.set(tags)
         ingredients = validated_data.pop('ingredients', None)
-        instance.ingredients.clear()
-        self.create_ingredients(ingredients, instance)
+        if ingredients is not None:
+            ShoplistIngredient.change_amounts(
+                list(instance.shoplists.values_list('user_id', flat=True)),
+                self.update_ingredients(instance, ingredients)
+            )
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        prefetch_related_objects([instance], *recipe_lookups())
         return RecipeSerializer(
             instance,
             context=self.context
@@ -242,6 +404,8 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
 
 class RecipeSmallSizeSerializer(serializers.ModelSerializer):
     """Сериализатор краткой информации по рецепту."""
+    image = RecipeImageField(size='small')
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
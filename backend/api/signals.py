@@ -0,0 +1,51 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.cache import (FEED_VERSION, bump_author_version,
+                       bump_reference_version, bump_user_state_version,
+                       bump_version, follow_graph)
+from recipes.models import (Favorite, Follow, Ingredient, IngredientRecipe,
+                            Recipe, RecipeTag, Shoplist, Tag, User)
+
+# Поля пользователя, которые отдаются вместе с его рецептами.
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def reference_data_changed(sender, **kwargs):
+    bump_reference_version(sender)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientRecipe)
+@receiver(m2m_changed, sender=RecipeTag)
+def feed_changed(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(FEED_VERSION))
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    """Сохранения только служебных полей (например, last_login
+    при входе) ответы с рецептами не меняют."""
+    if update_fields is not None and not AUTHOR_FIELDS & update_fields:
+        return
+
+    def on_commit():
+        bump_author_version(instance.id)
+        bump_version(FEED_VERSION)
+
+    transaction.on_commit(on_commit)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=Shoplist)
+@receiver((post_save, post_delete), sender=Follow)
+def user_state_changed(sender, instance, **kwargs):
+    def on_commit():
+        if sender is Follow:
+            follow_graph.invalidate(instance.user_id)
+        bump_user_state_version(instance.user_id)
+
+    transaction.on_commit(on_commit)
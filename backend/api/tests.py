@@ -0,0 +1,394 @@
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from api.cache import follow_graph
+from api.pagination import CachedCountPagination
+from api.renderers import FastJSONRenderer
+from api.serializers import RecipeSerializer
+from api.views import RecipeViewSet
+from fork_spoon.cache import cache_metrics
+from recipes.models import (IMAGE_READY, Favorite, Follow, Ingredient,
+                            IngredientRecipe, Recipe, Shoplist,
+                            ShoplistIngredient, Tag, User)
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'fork_spoon.cache.LocMemCache',
+        'LOCATION': 'api-tests',
+    }
+}
+IMAGE = (
+    'data:image/png;base64,'
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGA'
+    'WjR9awAAAABJRU5ErkJggg=='
+)
+RECIPES_COUNT = 12
+TAGS_PER_RECIPE = 2
+INGREDIENTS_PER_RECIPE = 4
+
+
+def create_recipes(authors, tags, ingredients, count):
+    """Рецепты по очереди от каждого из 'authors' с частью тегов
+    и продуктов."""
+    recipes = []
+    for number in range(count):
+        recipe = Recipe.objects.create(
+            author=authors[number % len(authors)],
+            name=f'Рецепт {number}',
+            image=f'recipes/images/recipe_{number}.png',
+            text=f'Описание {number}',
+            cooking_time=number + 1
+        )
+        recipe.tags.set(tags[number % 2:number % 2 + TAGS_PER_RECIPE])
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredient=ingredient,
+                             amount=number + index + 1)
+            for index, ingredient in enumerate(
+                ingredients[number % 3:number % 3 + INGREDIENTS_PER_RECIPE]
+            )
+        )
+        recipes.append(recipe)
+    return recipes
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RecipesTestCase(APITestCase):
+    """Рецепты разных авторов; читатель подписан на одного из них,
+    один рецепт у него в избранном, другой - в списке покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Читателев', password='pass'
+        )
+        authors = [
+            User.objects.create_user(
+                email=f'author{number}@example.com',
+                username=f'author{number}',
+                first_name='Автор', last_name=str(number), password='pass'
+            ) for number in range(3)
+        ]
+        tags = [
+            Tag.objects.create(name=f'Тег {number}', color='#00FF00',
+                               slug=f'tag{number}')
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f'Продукт {number}',
+                                      measurement_unit='г')
+            for number in range(6)
+        ]
+        recipes = create_recipes(authors, tags, ingredients, RECIPES_COUNT)
+        Follow.objects.create(user=cls.user, following=authors[0])
+        Favorite.objects.create(user=cls.user, recipe=recipes[-1])
+        Shoplist.objects.create(user=cls.user, recipe=recipes[-2])
+        Recipe.objects.filter(pk=recipes[-3].pk).update(
+            image_status=IMAGE_READY
+        )
+        cls.recipe = recipes[-1]
+
+    def setUp(self):
+        cache.clear()
+        follow_graph.clear()
+
+
+class RecipeListQueriesTest(RecipesTestCase):
+    """Число запросов списка рецептов не зависит от размера страницы."""
+
+    # Анонимный пользователь: число рецептов, страница, теги,
+    # продукты рецептов.
+    ANONYMOUS_QUERIES = 4
+    # Пользователь: ещё подписки, избранное и список покупок.
+    AUTHENTICATED_QUERIES = 7
+
+    def assert_list_queries(self, queries):
+        """Проверяет и число обращений к кешу: подписки читаются
+        из него один раз за запрос, а не для каждого рецепта."""
+        cache_reads = set()
+        for page_size in (3, RECIPES_COUNT):
+            with self.subTest(page_size=page_size), mock.patch.object(
+                CachedCountPagination, 'page_size', page_size
+            ):
+                cache.clear()
+                follow_graph.clear()
+                before = cache_metrics.snapshot()
+                with self.assertNumQueries(queries):
+                    response = self.client.get('/api/recipes/')
+                after = cache_metrics.snapshot()
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), page_size)
+                cache_reads.add(
+                    after['hits'] + after['misses']
+                    - before['hits'] - before['misses']
+                )
+        self.assertEqual(len(cache_reads), 1)
+
+    def test_anonymous_list_queries(self):
+        self.assert_list_queries(self.ANONYMOUS_QUERIES)
+
+    def test_authenticated_list_queries(self):
+        self.client.force_authenticate(self.user)
+        self.assert_list_queries(self.AUTHENTICATED_QUERIES)
+
+
+class RecipeReadSerializerTest(RecipesTestCase):
+    """RecipeReadSerializer отдаёт те же байты, что RecipeSerializer."""
+
+    def get_content(self, url):
+        cache.clear()
+        follow_graph.clear()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def assert_same_content(self):
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.id}/'):
+            with self.subTest(url=url):
+                content = self.get_content(url)
+                with mock.patch.object(
+                    RecipeViewSet,
+                    'get_serializer_class',
+                    lambda view: RecipeSerializer
+                ):
+                    self.assertEqual(content, self.get_content(url))
+
+    def test_anonymous_content(self):
+        self.assert_same_content()
+
+    def test_authenticated_content(self):
+        self.client.force_authenticate(self.user)
+        self.assert_same_content()
+
+
+class RecipePaginationTest(RecipesTestCase):
+    """Страница не зависит от закешированного числа рецептов."""
+
+    def get_names(self, params=None):
+        response = self.client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['count'], [
+            recipe['name'] for recipe in response.data['results']
+        ]
+
+    def test_favorite_then_list(self):
+        self.client.force_authenticate(self.user)
+        params = {'is_favorited': 1}
+        self.assertEqual(self.get_names(params), (1, [self.recipe.name]))
+        recipe = Recipe.objects.exclude(pk=self.recipe.pk).first()
+        self.client.post(f'/api/recipes/{recipe.id}/favorite/')
+        self.assertEqual(
+            self.get_names(params), (2, [self.recipe.name, recipe.name])
+        )
+        for favorite in (self.recipe, recipe):
+            self.client.delete(f'/api/recipes/{favorite.id}/favorite/')
+        self.assertEqual(self.get_names(params), (0, []))
+
+    def test_new_recipe_on_last_page(self):
+        with mock.patch.object(CachedCountPagination, 'page_size', 5):
+            self.assertEqual(self.get_names()[0], RECIPES_COUNT)
+            create_recipes(
+                [self.user], Tag.objects.all(), Ingredient.objects.all(), 1
+            )
+            count, names = self.get_names({'page': 3})
+        self.assertEqual(count, RECIPES_COUNT + 1)
+        self.assertEqual(len(names), 3)
+
+
+class RecipeConditionalGetTest(RecipesTestCase):
+    """ETag меняется вместе со всем, что входит в ответ."""
+
+    def assert_modified(self, url, change):
+        response = self.client.get(url)
+        self.assertEqual(
+            self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            ).status_code,
+            304
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_author_renamed(self):
+        author = self.recipe.author
+
+        def rename():
+            author.first_name = 'Переименованный'
+            author.save()
+
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.id}/'):
+            with self.subTest(url=url):
+                self.assert_modified(url, rename)
+
+    def test_new_recipe_in_list(self):
+        response = self.assert_modified('/api/recipes/', lambda: (
+            create_recipes(
+                [self.user], Tag.objects.all(), Ingredient.objects.all(), 1
+            )
+        ))
+        self.assertEqual(response.data['count'], RECIPES_COUNT + 1)
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    """FastJSONRenderer отдаёт те же байты, что JSONRenderer."""
+
+    def test_same_content(self):
+        for data in (
+            {'id': 1, 'name': 'Продукт\u2028', 'is_favorited': True},
+            [{'amount': 1.5}, {'amount': 1e16}, {'amount': 1e-05}],
+            {'created': datetime(2026, 1, 2, 3, 4, 5, 678901),
+             'price': Decimal('1.10'), 'time': timedelta(seconds=90)},
+            {'id': 2 ** 70, 'ids': [2 ** 53 + 1]},
+            {1: 'ключ-число'},
+            1e16,
+            None,
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(
+                    FastJSONRenderer().render(data),
+                    JSONRenderer().render(data)
+                )
+
+    def test_non_finite_float(self):
+        for value in (float('nan'), float('inf')):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                FastJSONRenderer().render({'amount': value})
+
+
+class RecipeWriteQueriesTest(RecipesTestCase):
+    """Число запросов создания и изменения рецепта не зависит
+    от числа продуктов."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = mkdtemp()
+        self.addCleanup(rmtree, media_root)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.client.force_authenticate(self.user)
+        patcher = mock.patch('api.views.submit_recipe_image')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Запись {number}', measurement_unit='г')
+            for number in range(30)
+        )
+
+    def recipe_data(self, ingredients_count):
+        return {
+            'tags': [tag.id for tag in Tag.objects.all()],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 10}
+                for ingredient in self.ingredients[:ingredients_count]
+            ],
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+        }
+
+    def count_queries(self, method, url, data):
+        cache.clear()
+        follow_graph.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = method(url, data, format='json')
+        self.assertIn(response.status_code, (200, 201), response.data)
+        self.assertEqual(
+            len(response.data['ingredients']), len(data['ingredients'])
+        )
+        return len(context.captured_queries)
+
+    def test_create_queries(self):
+        self.assertEqual(*(
+            self.count_queries(
+                self.client.post, '/api/recipes/',
+                {**self.recipe_data(count), 'image': IMAGE}
+            ) for count in (2, 30)
+        ))
+
+    def test_update_queries(self):
+        queries = []
+        for count in (2, 30):
+            recipe = create_recipes([self.user], Tag.objects.all(), [], 1)[0]
+            queries.append(self.count_queries(
+                self.client.patch,
+                f'/api/recipes/{recipe.id}/',
+                self.recipe_data(count)
+            ))
+        self.assertEqual(*queries)
+
+
+class ShoplistIngredientTest(RecipesTestCase):
+    """Итоги списков покупок после каждого изменения совпадают
+    с пересчётом командой rebuild_shoplist_ingredients."""
+
+    def totals(self):
+        return set(ShoplistIngredient.objects.values_list(
+            'user_id', 'ingredient_id', 'amount'
+        ))
+
+    def assert_totals(self):
+        totals = self.totals()
+        with redirect_stdout(StringIO()):
+            call_command('rebuild_shoplist_ingredients')
+        self.assertEqual(totals, self.totals())
+
+    def cart(self, method, recipe):
+        response = method(f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assertIn(response.status_code, (201, 204))
+        self.assert_totals()
+
+    def test_totals(self):
+        recipe, other = Recipe.objects.filter(
+            author=self.recipe.author
+        )[:2]
+        self.client.force_authenticate(self.user)
+        self.cart(self.client.post, recipe)
+        self.cart(self.client.post, other)
+        self.cart(self.client.delete, other)
+        self.cart(self.client.post, other)
+        self.assertTrue(self.totals())
+
+        self.client.force_authenticate(recipe.author)
+        amounts = list(recipe.amounts.all())
+        new_ingredient = Ingredient.objects.exclude(
+            pk__in=[amount.ingredient_id for amount in amounts]
+        ).first()
+        response = self.client.patch(
+            f'/api/recipes/{recipe.id}/',
+            {
+                'ingredients': [
+                    {'id': amounts[0].ingredient_id, 'amount': 100},
+                    {'id': amounts[1].ingredient_id,
+                     'amount': amounts[1].amount},
+                    {'id': new_ingredient.id, 'amount': 7},
+                ],
+                'tags': [tag.id for tag in recipe.tags.all()],
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assert_totals()
+
+        response = self.client.delete(f'/api/recipes/{other.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assert_totals()
@@ -1,8 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from api.views import (CommonUserViewSet, IngredientViewSet, RecipeViewSet,
-                       SubscriptionsList, TagViewSet)
+from api.views import (CacheStatsView, CommonUserViewSet, IngredientViewSet,
+                       RecipeViewSet, SubscriptionsList, TagViewSet)
 
 app_name = 'api'
 
@@ -14,6 +14,7 @@ router.register('recipes', RecipeViewSet, basename='recipes')
 
 urlpatterns = [
     path('users/subscriptions/', SubscriptionsList.as_view()),
+    path('cache/stats/', CacheStatsView.as_view()),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
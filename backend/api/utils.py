@@ -1,25 +1,146 @@
+import csv
+import json
 from datetime import datetime
+from hashlib import md5
 
+from django.conf import settings
+from django.utils.http import parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import exceptions
 
-def create_shopping_list(recipes, shopping_list):
-    recipes_list = '\n'.join(
-        f'{index}. {item}' for index, item in enumerate(
-            [recipe['recipe__name'] for recipe in recipes],
-            start=1
+from api.cache import follow_graph
+
+RECIPE_COLLECTIONS_ATTR = '_recipe_collections'
+FOLLOWINGS_ATTR = '_followings'
+
+
+def get_recipe_collection(request, model):
+    """Множество id рецептов пользователя в коллекции 'model'
+    ('Favorite' или 'Shoplist'). Загружается одним запросом
+    и кешируется на время обработки запроса."""
+    collections = getattr(request, RECIPE_COLLECTIONS_ATTR, None)
+    if collections is None:
+        collections = {}
+        setattr(request, RECIPE_COLLECTIONS_ATTR, collections)
+    if model not in collections:
+        collections[model] = set(
+            model.objects.filter(
+                user=request.user
+            ).values_list('recipe_id', flat=True)
         )
+    return collections[model]
+
+
+def reset_recipe_collection(request, model):
+    """Сбрасывает закешированную коллекцию после её изменения."""
+    getattr(request, RECIPE_COLLECTIONS_ATTR, {}).pop(model, None)
+
+
+def get_followings(request):
+    """Множество id авторов, на которых подписан пользователь.
+    Берётся из follow_graph один раз за запрос."""
+    followings = getattr(request, FOLLOWINGS_ATTR, None)
+    if followings is None:
+        followings = follow_graph.get(request.user.id)
+        setattr(request, FOLLOWINGS_ATTR, followings)
+    return followings
+
+
+def get_recipes_limit(request):
+    """Число рецептов автора из параметра 'recipes_limit',
+    ограниченное сверху настройкой SUBSCRIPTIONS_RECIPES_LIMIT."""
+    try:
+        limit = int(request.GET.get(
+            'recipes_limit', settings.SUBSCRIPTIONS_RECIPES_LIMIT
+        ))
+    except ValueError:
+        raise exceptions.ValidationError({
+            'Введите число!'
+        })
+    return max(0, min(limit, settings.SUBSCRIPTIONS_RECIPES_LIMIT))
+
+
+def make_etag(*parts):
+    """Строгий ETag из частей, однозначно определяющих ответ."""
+    return quote_etag(
+        md5(':'.join(map(str, parts)).encode()).hexdigest()
     )
-    products = '\n'.join([
-        f'* {ingredient["recipe__ingredients__name"]} '
-        f'- {ingredient["amount"]} '
-        f'({ingredient["recipe__ingredients__measurement_unit"]})'
-        for ingredient in shopping_list
-    ])
-    return (
-        'Список продуктов для приготовления рецептов из Fork-Spoon\n'
-        f'Дата создания списка {datetime.today():%d.%m.%Y} г.\n'
-        'Рецепты:\n'
-        f'{recipes_list}'
-        '\n'
-        'Продукты:\n'
-        f'{products}'
+
+
+def etag_matches(request, etag):
+    """Проверяет, есть ли 'etag' в заголовке If-None-Match запроса."""
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    return '*' in etags or etag in etags
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """Проверяет условия If-None-Match и If-Modified-Since запроса.
+    If-Modified-Since учитывается только без If-None-Match."""
+    if 'If-None-Match' in request.headers:
+        return etag_matches(request, etag)
+    if last_modified is None:
+        return False
+    since = parse_http_date_safe(
+        request.headers.get('If-Modified-Since', '')
     )
+    return since is not None and int(last_modified.timestamp()) <= since
+
+
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def shopping_list_txt(recipes, shopping_list):
+    """Построчно формирует текстовый список покупок."""
+    yield 'Список продуктов для приготовления рецептов из Fork-Spoon\n'
+    yield f'Дата создания списка {datetime.today():%d.%m.%Y} г.\n'
+    yield 'Рецепты:\n'
+    for index, recipe in enumerate(recipes, start=1):
+        yield f'{index}. {recipe["recipe__name"]}\n'
+    yield 'Продукты:\n'
+    for ingredient in shopping_list:
+        yield (
+            f'* {ingredient["ingredient__name"]} '
+            f'- {ingredient["amount"]} '
+            f'({ingredient["ingredient__measurement_unit"]})\n'
+        )
+
+
+def shopping_list_csv(recipes, shopping_list):
+    """Построчно формирует список продуктов в формате CSV."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Продукт', 'Количество', 'Мера'))
+    for ingredient in shopping_list:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['amount'],
+            ingredient['ingredient__measurement_unit'],
+        ))
+
+
+def shopping_list_json(recipes, shopping_list):
+    """Частями формирует список покупок в формате JSON."""
+    yield f'{{"date": "{datetime.today():%Y-%m-%d}", "recipes": ['
+    for index, recipe in enumerate(recipes):
+        yield ', ' * bool(index) + json.dumps(
+            recipe['recipe__name'], ensure_ascii=False
+        )
+    yield '], "ingredients": ['
+    for index, ingredient in enumerate(shopping_list):
+        yield ', ' * bool(index) + json.dumps({
+            'name': ingredient['ingredient__name'],
+            'amount': ingredient['amount'],
+            'measurement_unit': (
+                ingredient['ingredient__measurement_unit']
+            ),
+        }, ensure_ascii=False)
+    yield ']}'
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': (shopping_list_txt, 'text/plain; charset=utf-8'),
+    'csv': (shopping_list_csv, 'text/csv; charset=utf-8'),
+    'json': (shopping_list_json, 'application/json'),
+}
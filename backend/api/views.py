@@ -1,32 +1,59 @@
+from collections import defaultdict
 from datetime import datetime
 
-from django.http import FileResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.http import content_disposition_header, http_date
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import exceptions, generics, mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from api.filters import FilterOfRecipe, IngredientSearchFilter
+from api.cache import (FEED_VERSION, bump_version, get_author_version,
+                       get_reference_version, get_user_state_version,
+                       get_version)
+from api.filters import FilterOfRecipe
+from api.pagination import CachedCountPagination, RecipeCursorPagination
+from api.parsers import JSONLinesParser, MultiPartJSONParser
 from api.permissions import IsAuthorOrReadOnly
+from api.search import ingredient_index
 from api.serializers import (CommonUserSerializer, FollowUserSerializer,
                              IngredientSerializer,
-                             RecipeCreateUpdateSerializer, RecipeSerializer,
-                             RecipeSmallSizeSerializer, TagSerializer)
-from api.utils import create_shopping_list
-from recipes.models import (Favorite, Follow, Ingredient, Recipe, Shoplist,
-                            Tag, User)
+                             RecipeCreateUpdateSerializer,
+                             RecipeReadSerializer, RecipeSerializer,
+                             RecipeSmallSizeSerializer, TagSerializer,
+                             recipe_lookups)
+from api.utils import (SHOPPING_LIST_FORMATS, etag_matches, get_recipes_limit,
+                       is_not_modified, make_etag, reset_recipe_collection)
+from recipes.catalog import CatalogError, export_recipes, import_recipes
+from recipes.models import (IMAGE_PENDING, Favorite, Follow, Ingredient,
+                            Recipe, Shoplist, ShoplistIngredient, Tag, User)
+from recipes.tasks import submit_recipe_image
+
+REFERENCE_CACHE_CONTROL = 'public, no-cache'
+REFERENCE_RESPONSE_KEY = 'reference-response:{}'
+RECIPE_CACHE_CONTROL = 'private, no-cache'
+RECIPE_LIST_ACTIONS = ('list', 'feed', 'popular')
+RECIPE_READ_ACTIONS = (*RECIPE_LIST_ACTIONS, 'retrieve')
+RECIPE_CATALOG_CONTENT_TYPE = 'application/x-ndjson'
+RECIPE_CATALOG_FILE_NAME = 'recipes.jsonl'
+RECIPE_LIST_IMAGE_SIZE = 'medium'
 
 
 class CommonUserViewSet(UserViewSet):
     """Вьюсет модели Users."""
     queryset = User.objects.all()
     serializer_class = CommonUserSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = CachedCountPagination
     permission_classes = (IsAuthenticatedOrReadOnly,)
 
     def get_permissions(self):
@@ -64,7 +91,7 @@ class CommonUserViewSet(UserViewSet):
                 ).data,
                 status.HTTP_201_CREATED
             )
-        following.delete()
+        get_object_or_404(Follow, user=user, following=following).delete()
         return Response(
             (f'Вы отписались от автора: {following.first_name}'
              f' {following.last_name}.'),
@@ -75,20 +102,94 @@ class SubscriptionsList(generics.ListCreateAPIView):
     """Подписки пользователя."""
     serializer_class = FollowUserSerializer
     permission_classes = (IsAuthenticated,)
-    pagination_class = PageNumberPagination
+    pagination_class = CachedCountPagination
 
     def get_queryset(self):
         return User.objects.filter(following__user=self.request.user)
 
+    def get_count_version(self):
+        return get_user_state_version(self.request.user.id)
+
+    def list(self, request, *args, **kwargs):
+        """Рецепты всех авторов страницы загружаются одним запросом:
+        не более 'recipes_limit' последних у каждого автора."""
+        authors = self.paginate_queryset(self.get_queryset())
+        recipes = Recipe.objects.annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('author'),
+                order_by=(F('pub_date').desc(), F('id').desc())
+            )
+        ).filter(
+            author__in=[author.id for author in authors],
+            row_number__lte=get_recipes_limit(request)
+        ).order_by('author', 'row_number')
+        recipes_by_author = defaultdict(list)
+        for recipe in recipes:
+            recipes_by_author[recipe.author_id].append(recipe)
+        serializer = self.get_serializer(
+            authors,
+            many=True,
+            context={
+                **self.get_serializer_context(),
+                'recipes_by_author': recipes_by_author,
+            }
+        )
+        return self.get_paginated_response(serializer.data)
+
+
+class CacheStatsView(APIView):
+    """Статистика кеша: попадания, промахи и вытеснения."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response({
+            'backend': settings.CACHE_BACKEND,
+            **cache.stats(),
+        })
+
 
 class RetrieveListViewSet(
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet
 ):
+    """Справочник с кешированием ответов по версии данных модели.
+
+    Ответы снабжаются ETag, при совпадении If-None-Match
+    возвращается 304 без обращения к базе и сериализатору."""
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = None
 
+    def cached_response(self, request, get_response, *args, **kwargs):
+        etag = make_etag(
+            get_reference_version(self.queryset.model),
+            request.accepted_renderer.format,
+            request.get_full_path()
+        )
+        headers = {
+            'ETag': etag,
+            'Cache-Control': REFERENCE_CACHE_CONTROL,
+        }
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+        key = REFERENCE_RESPONSE_KEY.format(etag)
+        data = cache.get(key)
+        if data is None:
+            data = get_response(request, *args, **kwargs).data
+            data = list(data) if isinstance(data, list) else dict(data)
+            cache.set(key, data, settings.REFERENCE_RESPONSE_CACHE_TTL)
+        return Response(data, headers=headers)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
 
 class TagViewSet(RetrieveListViewSet):
     queryset = Tag.objects.all()
@@ -98,8 +199,19 @@ class TagViewSet(RetrieveListViewSet):
 class IngredientViewSet(RetrieveListViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (IngredientSearchFilter,)
-    search_fields = ('^name',)
+
+    def list(self, request, *args, **kwargs):
+        """По '?name=' ищет продукты по началу названия
+        в индексе в памяти, без обращения к базе."""
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        return self.cached_response(
+            request,
+            lambda request: Response(ingredient_index.search(
+                name, settings.INGREDIENT_SEARCH_LIMIT
+            ))
+        )
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -108,13 +220,119 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthorOrReadOnly, IsAuthenticatedOrReadOnly)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = FilterOfRecipe
-    pagination_class = PageNumberPagination
+    pagination_class = CachedCountPagination
+    parser_classes = (JSONParser, MultiPartJSONParser)
+
+    @property
+    def paginator(self):
+        """По '?pagination=cursor' использует пагинацию по курсору,
+        по умолчанию остаётся постраничная с полем 'count'."""
+        if (not hasattr(self, '_paginator')
+                and self.action in ('list', 'feed')
+                and self.request.query_params.get('pagination') == 'cursor'):
+            self._paginator = RecipeCursorPagination()
+        return super().paginator
+
+    def get_queryset(self):
+        """Загружает рецепты вместе со всеми данными для сериализатора,
+        чтобы число запросов не зависело от размера страницы."""
+        return Recipe.objects.select_related('author').prefetch_related(
+            *recipe_lookups()
+        )
+
+    def conditional_response(self, request, validators, last_modified,
+                             get_response, *args, **kwargs):
+        """Отвечает 304, если у клиента актуальная версия ответа.
+
+        ETag строится из 'validators', версий справочников и, для
+        пользователя, версии его избранного, покупок и подписок."""
+        user = request.user
+        etag = make_etag(
+            *validators,
+            get_reference_version(Tag),
+            get_reference_version(Ingredient),
+            user.id,
+            user.is_authenticated and get_user_state_version(user.id),
+            request.accepted_renderer.format,
+            request.get_full_path()
+        )
+        headers = {
+            'ETag': etag,
+            'Cache-Control': RECIPE_CACHE_CONTROL,
+            'Vary': 'Authorization',
+        }
+        if last_modified is not None:
+            headers['Last-Modified'] = http_date(last_modified.timestamp())
+        if is_not_modified(request, etag, last_modified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+        response = get_response(request, *args, **kwargs)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def get_count_version(self):
+        """Число рецептов меняется вместе с лентой, а с фильтрами
+        по избранному и покупкам - и с состоянием пользователя."""
+        user = self.request.user
+        if user.is_anonymous:
+            return get_version(FEED_VERSION)
+        return '{}:{}'.format(
+            get_version(FEED_VERSION), get_user_state_version(user.id)
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, (get_version(FEED_VERSION),), None,
+            super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            updated_at, author_id = Recipe.objects.values_list(
+                'updated_at', 'author_id'
+            ).get(pk=kwargs['pk'])
+        except (Recipe.DoesNotExist, TypeError, ValueError):
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional_response(
+            request,
+            (
+                kwargs['pk'],
+                updated_at.isoformat(),
+                get_author_version(author_id)
+            ),
+            updated_at if request.user.is_anonymous else None,
+            super().retrieve, *args, **kwargs
+        )
 
     def get_serializer_class(self):
         if self.action in ('create', 'partial_update'):
             return RecipeCreateUpdateSerializer
+        if self.action in RECIPE_READ_ACTIONS:
+            return RecipeReadSerializer
         return RecipeSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in RECIPE_LIST_ACTIONS:
+            context['image_size'] = RECIPE_LIST_IMAGE_SIZE
+        return context
+
+    def save_recipe(self, serializer):
+        """Сохраняет рецепт и ставит новую картинку в очередь
+        на обработку."""
+        if 'image' not in serializer.validated_data:
+            serializer.save()
+            return
+        recipe = serializer.save(image_status=IMAGE_PENDING)
+        submit_recipe_image(recipe.pk)
+
+    def perform_create(self, serializer):
+        self.save_recipe(serializer)
+
+    def perform_update(self, serializer):
+        self.save_recipe(serializer)
+
     def add_or_delete_recipe(self, request, model, pk):
         """Вспомогательная функция для методов 'favorite', 'shoping_cart'."""
         user = self.request.user
@@ -127,11 +345,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 raise exceptions.ValidationError({
                     f'Рецепт {recipe.name} уже добавлен.'
                 })
+            reset_recipe_collection(request, model)
             return Response(
                 RecipeSmallSizeSerializer(recipe).data,
                 status.HTTP_201_CREATED
             )
-        get_object_or_404(model, recipe_id=pk).delete()
+        get_object_or_404(model, user=user, recipe_id=pk).delete()
+        reset_recipe_collection(request, model)
         return Response('Рецепт удалён.', status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -154,19 +374,88 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Добавление или удаление рецепта из списка покупок."""
         return self.add_or_delete_recipe(request, Shoplist, pk)
 
+    @action(detail=False,
+            methods=('get',),
+            permission_classes=(IsAuthenticated,)
+            )
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь."""
+        recipes = self.filter_queryset(self.get_queryset()).filter(
+            author__in=Follow.objects.filter(
+                user=request.user
+            ).values('following')
+        )
+        page = self.paginate_queryset(recipes)
+        return self.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        )
+
+    @action(detail=False, methods=('get',))
+    def popular(self, request):
+        """Популярные рецепты по заранее рассчитанному рейтингу."""
+        recipes = self.filter_queryset(self.get_queryset()).filter(
+            popularity__isnull=False
+        ).order_by('popularity__rank')
+        page = self.paginate_queryset(recipes)
+        return self.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        )
+
     @action(detail=False,
             methods=('get',),
             permission_classes=(IsAuthenticated,)
             )
     def download_shopping_cart(self, request):
         """Выгружает общий список продуктов из рецептов,
-        добавленных в список покупок."""
+        добавленных в список покупок. Формат файла задаётся
+        параметром '?type=' (txt, csv или json)."""
         user = request.user
-        return FileResponse(
+        file_type = request.query_params.get('type', 'txt')
+        if file_type not in SHOPPING_LIST_FORMATS:
+            raise exceptions.ValidationError({
+                'type': f'Доступные форматы: '
+                        f'{", ".join(SHOPPING_LIST_FORMATS)}.'
+            })
+        create_shopping_list, content_type = SHOPPING_LIST_FORMATS[file_type]
+        response = StreamingHttpResponse(
             create_shopping_list(
-                Shoplist.recipes_in_shoplist(user),
-                Shoplist.ingredients_in_shoplist(user)
+                Shoplist.recipes_in_shoplist(user).iterator(),
+                ShoplistIngredient.ingredients_in_shoplist(user).iterator()
             ),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = content_disposition_header(
             as_attachment=True,
-            filename=f'Список покупок {datetime.today():%d.%m.%Y}.txt'
+            filename=(
+                f'Список покупок {datetime.today():%d.%m.%Y}.{file_type}'
+            )
         )
+        return response
+
+    @action(detail=False,
+            methods=('get', 'post'),
+            permission_classes=(IsAdminUser,),
+            parser_classes=(JSONLinesParser,)
+            )
+    def catalog(self, request):
+        """Каталог рецептов в формате JSON Lines: GET выгружает все
+        рецепты ('?images=0' - без картинок), POST загружает их."""
+        if request.method == 'GET':
+            response = StreamingHttpResponse(
+                export_recipes(
+                    Recipe.objects.all(),
+                    with_images=request.query_params.get('images') != '0'
+                ),
+                content_type=RECIPE_CATALOG_CONTENT_TYPE
+            )
+            response['Content-Disposition'] = content_disposition_header(
+                as_attachment=True, filename=RECIPE_CATALOG_FILE_NAME
+            )
+            return response
+        try:
+            count = import_recipes(request.data)
+        except CatalogError as error:
+            raise exceptions.ValidationError({'catalog': str(error)})
+        finally:
+            bump_version(FEED_VERSION)
+        return Response({'imported': count}, status=status.HTTP_201_CREATED)
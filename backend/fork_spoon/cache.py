@@ -0,0 +1,98 @@
+import random
+from collections import Counter
+from threading import Lock
+
+from django.core.cache.backends import filebased, locmem, redis
+
+MISSING = object()
+
+
+class CacheMetrics:
+    """Счётчики попаданий, промахов и вытеснений кеша в процессе."""
+
+    def __init__(self):
+        self._counters = Counter()
+        self._lock = Lock()
+
+    def record(self, name, count=1):
+        if count:
+            with self._lock:
+                self._counters[name] += count
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: self._counters[name]
+                for name in ('hits', 'misses', 'evictions')
+            }
+
+
+cache_metrics = CacheMetrics()
+
+
+class MetricsCacheMixin:
+    """Добавляет бэкенду кеша учёт попаданий и промахов."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, MISSING, version)
+        if value is MISSING:
+            cache_metrics.record('misses')
+            return default
+        cache_metrics.record('hits')
+        return value
+
+    def stats(self):
+        return {'process': cache_metrics.snapshot()}
+
+
+class LocMemCache(MetricsCacheMixin, locmem.LocMemCache):
+
+    def _cull(self):
+        size = len(self._cache)
+        super()._cull()
+        cache_metrics.record('evictions', size - len(self._cache))
+
+
+class FileBasedCache(MetricsCacheMixin, filebased.FileBasedCache):
+
+    def _cull(self):
+        """Очистка как в FileBasedCache, но по одному списку файлов,
+        из которого считаются и вытеснения."""
+        filelist = self._list_cache_files()
+        if len(filelist) < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            self.clear()
+            cache_metrics.record('evictions', len(filelist))
+            return
+        evictions = 0
+        for fname in random.sample(
+            filelist, int(len(filelist) / self._cull_frequency)
+        ):
+            evictions += self._delete(fname)
+        cache_metrics.record('evictions', evictions)
+
+
+class RedisCache(MetricsCacheMixin, redis.RedisCache):
+    """Вытеснения выполняет сам Redis (maxmemory-policy),
+    их число берётся из статистики сервера."""
+
+    def get_many(self, keys, version=None):
+        """В отличие от остальных бэкендов, читает ключи одним
+        запросом, минуя get, поэтому учитывает их сам."""
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        cache_metrics.record('hits', len(found))
+        cache_metrics.record('misses', len(keys) - len(found))
+        return found
+
+    def stats(self):
+        info = self._cache.get_client().info('stats')
+        return {
+            **super().stats(),
+            'server': {
+                'hits': info['keyspace_hits'],
+                'misses': info['keyspace_misses'],
+                'evictions': info['evicted_keys'],
+            },
+        }
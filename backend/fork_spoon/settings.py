@@ -117,6 +117,62 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 IMAGE_PLACEMENT = 'recipes/images/'
+IMAGE_FORMAT = os.getenv('IMAGE_FORMAT', 'WEBP')
+IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', 80))
+IMAGE_MAX_SIZE = (1280, 1280)
+IMAGE_THUMBNAIL_SIZES = {
+    'small': (160, 160),
+    'medium': (480, 480),
+}
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
+
+APP_VERSION = os.getenv('APP_VERSION', '1')
+
+# Версии кешей (справочники, лента, подписки) сбрасываются и сервером,
+# и командами manage.py, поэтому кеш должен быть общим для процессов:
+# file или redis. locmem подходит только для одного процесса сервера
+# без команд, меняющих данные.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'file')
+CACHE_BACKENDS = {
+    'locmem': ('fork_spoon.cache.LocMemCache', 'fork_spoon'),
+    'file': ('fork_spoon.cache.FileBasedCache', '/var/tmp/fork_spoon_cache'),
+    'redis': ('fork_spoon.cache.RedisCache', 'redis://127.0.0.1:6379'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]
+        ),
+        'KEY_PREFIX': f'fork_spoon:{APP_VERSION}',
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', 300)),
+    }
+}
+if CACHE_BACKEND != 'redis':
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+    }
+
+FOLLOW_GRAPH_CACHE_TTL = int(os.getenv('FOLLOW_GRAPH_CACHE_TTL', 300))
+FOLLOW_GRAPH_CACHE_SIZE = int(os.getenv('FOLLOW_GRAPH_CACHE_SIZE', 10000))
+
+TAG_MAP_CACHE_TTL = int(os.getenv('TAG_MAP_CACHE_TTL', 300))
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+
+REFERENCE_RESPONSE_CACHE_TTL = int(
+    os.getenv('REFERENCE_RESPONSE_CACHE_TTL', 60 * 60 * 24)
+)
+
+SUBSCRIPTIONS_RECIPES_LIMIT = int(os.getenv('SUBSCRIPTIONS_RECIPES_LIMIT', 20))
+
+POPULAR_RECIPES_DAYS = int(os.getenv('POPULAR_RECIPES_DAYS', 7))
+POPULAR_RECIPES_LIMIT = int(os.getenv('POPULAR_RECIPES_LIMIT', 1000))
+
+PAGINATION_COUNT_CACHE_TTL = int(os.getenv('PAGINATION_COUNT_CACHE_TTL', 30))
+PAGINATION_COUNT_ESTIMATE_FROM = int(
+    os.getenv('PAGINATION_COUNT_ESTIMATE_FROM', 100000)
+)
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -127,7 +183,11 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.TokenAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS':
-        'rest_framework.pagination.PageNumberPagination',
+        'api.pagination.CachedCountPagination',
         'PAGE_SIZE': 6,
 }
@@ -6,8 +6,10 @@ from django.contrib.auth.models import Group
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 
-from .models import (Favorite, Follow, Ingredient, IngredientRecipe,
-                     Recipe, Shoplist, Tag, User)
+from .models import (IMAGE_PENDING, Favorite, Follow, Ingredient,
+                     IngredientRecipe, Recipe, RecipePopularity, Shoplist,
+                     ShoplistIngredient, Tag, User)
+from .tasks import submit_recipe_image
 
 admin.site.unregister(Group)
 
@@ -37,17 +39,17 @@ class CommonUserAdmin(UserAdmin):
     readonly_fields = ['is_active', 'is_staff', 'is_superuser']
     list_filter = (FollowersListFilter,)
 
-    @display(description='Рецепты')
+    @display(description='Рецепты', ordering='recipes_count')
     def recipes(self, user):
-        return user.recipes.count()
+        return user.recipes_count
 
-    @display(description='Подписчики')
+    @display(description='Подписчики', ordering='followers_count')
     def followers(self, user):
-        return user.following.count()
+        return user.followers_count
 
-    @display(description='Подписки')
+    @display(description='Подписки', ordering='following_count')
     def followings(self, user):
-        return user.follower.count()
+        return user.following_count
 
 
 @admin.register(Follow)
@@ -111,16 +113,18 @@ class RecipeAdmin(admin.ModelAdmin):
     inlines = (IngredientInline,)
     list_display = (
         'pk', 'name', 'author', 'cooking_time', 'get_tags', 'get_ingredients',
-        'get_recipe_in_favorites', 'get_image'
+        'get_recipe_in_favorites', 'get_image', 'image_status'
     )
 
-    list_filter = ('tags', 'author', PeriodsCookingtimeListFilter)
+    list_filter = (
+        'tags', 'author', PeriodsCookingtimeListFilter, 'image_status'
+    )
     search_fields = ('name', 'tags__name', 'author__username')
-    readonly_fields = ('get_image',)
+    readonly_fields = ('get_image', 'image_status')
 
-    @display(description='В избранном')
+    @display(description='В избранном', ordering='favorites_count')
     def get_recipe_in_favorites(self, recipe):
-        return recipe.favorites.count()
+        return recipe.favorites_count
 
     @display(description='Тег')
     def get_tags(self, recipe):
@@ -139,11 +143,18 @@ class RecipeAdmin(admin.ModelAdmin):
     @display(description='Картинка')
     def get_image(self, recipe):
         return mark_safe(
-            '<img src="/media/{}" width="40" height="40" />'.format(
-                recipe.image
+            '<img src="{}" width="40" height="40" />'.format(
+                recipe.image.storage.url(recipe.image_name('small'))
             )
         )
 
+    def save_model(self, request, recipe, form, change):
+        if 'image' in form.changed_data:
+            recipe.image_status = IMAGE_PENDING
+        super().save_model(request, recipe, form, change)
+        if 'image' in form.changed_data:
+            submit_recipe_image(recipe.pk)
+
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
@@ -166,3 +177,14 @@ class FavoriteAdmin(admin.ModelAdmin):
 class ShoplistAdmin(admin.ModelAdmin):
     list_display = ('pk', 'recipe', 'user')
     list_filter = ('recipe',)
+
+
+@admin.register(ShoplistIngredient)
+class ShoplistIngredientAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'ingredient', 'amount')
+    list_filter = ('user',)
+
+
+@admin.register(RecipePopularity)
+class RecipePopularityAdmin(admin.ModelAdmin):
+    list_display = ('rank', 'recipe', 'score')
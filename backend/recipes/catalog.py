@@ -0,0 +1,242 @@
+import json
+import mimetypes
+from base64 import b64decode, b64encode
+from collections import Counter, defaultdict
+from itertools import islice
+from uuid import uuid4
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Prefetch
+
+from recipes.models import (Ingredient, IngredientRecipe, Recipe, RecipeTag,
+                            Tag, User)
+
+CATALOG_BATCH_SIZE = 500
+IMAGE_DATA_URI = 'data:{mime_type};base64,{content}'
+IMAGE_DEFAULT_MIME_TYPE = 'application/octet-stream'
+IMAGE_FILE_NAME = '{name}{extension}'
+
+
+class CatalogError(ValueError):
+    """Ошибка в строке каталога рецептов."""
+
+    def __init__(self, number, message):
+        super().__init__(f'Строка {number}: {message}')
+
+
+def recipe_to_record(recipe, with_images=True):
+    """Запись каталога: автор, теги и продукты - по естественным
+    ключам, чтобы каталог переносился между базами."""
+    record = {
+        'author': recipe.author.username,
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'tags': [tag.slug for tag in recipe.tags.all()],
+        'ingredients': [
+            {
+                'name': amount.ingredient.name,
+                'measurement_unit': amount.ingredient.measurement_unit,
+                'amount': amount.amount,
+            } for amount in recipe.amounts.all()
+        ],
+        'image': None,
+    }
+    if with_images and recipe.image:
+        with recipe.image.open('rb') as image:
+            record['image'] = IMAGE_DATA_URI.format(
+                mime_type=(
+                    mimetypes.guess_type(recipe.image.name)[0]
+                    or IMAGE_DEFAULT_MIME_TYPE
+                ),
+                content=b64encode(image.read()).decode()
+            )
+    return record
+
+
+def export_recipes(recipes, with_images=True):
+    """Строки JSON Lines с рецептами 'recipes' от старых к новым.
+
+    Рецепты читаются из базы пачками по CATALOG_BATCH_SIZE, поэтому
+    память не зависит от размера каталога."""
+    recipes = recipes.select_related('author').prefetch_related(
+        'tags',
+        Prefetch(
+            'amounts',
+            queryset=IngredientRecipe.objects.select_related('ingredient')
+        )
+    ).order_by('pub_date', 'id')
+    for recipe in recipes.iterator(chunk_size=CATALOG_BATCH_SIZE):
+        yield json.dumps(
+            recipe_to_record(recipe, with_images), ensure_ascii=False
+        ) + '\n'
+
+
+def read_records(lines):
+    """Разбирает строки JSON Lines, пропуская пустые."""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            raise CatalogError(number, error)
+        if not isinstance(record, dict):
+            raise CatalogError(number, 'ожидался JSON-объект')
+        yield number, record
+
+
+def decode_image(number, data_uri):
+    try:
+        header, content = data_uri.split(';base64,', 1)
+        return ContentFile(
+            b64decode(content, validate=True),
+            name=IMAGE_FILE_NAME.format(
+                name=uuid4(),
+                extension=mimetypes.guess_extension(
+                    header.removeprefix('data:')
+                ) or ''
+            )
+        )
+    except (AttributeError, ValueError) as error:
+        raise CatalogError(number, f'картинка не в base64: {error}')
+
+
+def validate_fields(number, instance, exclude):
+    """Проверяет поля 'instance' теми же ограничениями модели
+    (длина, диапазон), что и база, чтобы ошибка была CatalogError."""
+    try:
+        instance.clean_fields(exclude=exclude)
+    except ValidationError as error:
+        raise CatalogError(number, '; '.join(
+            f'{field}: {" ".join(messages)}'
+            for field, messages in error.message_dict.items()
+        ))
+
+
+def build_recipe(number, record, authors, tags, ingredients):
+    """Рецепт, его теги, продукты и картинка из записи каталога.
+
+    Картинка только декодируется: файлы пишет import_batch, когда
+    проверена вся пачка."""
+    try:
+        author = authors[record['author']]
+    except KeyError:
+        raise CatalogError(
+            number, f'нет автора "{record.get("author")}"'
+        )
+    try:
+        recipe = Recipe(
+            author=author,
+            name=record['name'],
+            text=record['text'],
+            cooking_time=int(record['cooking_time'])
+        )
+        tag_ids = [tags[slug] for slug in record['tags']]
+        amounts = [
+            (
+                ingredients[
+                    (ingredient['name'], ingredient['measurement_unit'])
+                ],
+                int(ingredient['amount'])
+            ) for ingredient in record['ingredients']
+        ]
+    except KeyError as error:
+        raise CatalogError(number, f'не найдено: {error}')
+    except (TypeError, ValueError) as error:
+        raise CatalogError(number, error)
+    if not tag_ids or not amounts:
+        raise CatalogError(number, 'нужны хотя бы один тег и один продукт')
+    if recipe.cooking_time < 1 or any(amount < 1 for _, amount in amounts):
+        raise CatalogError(
+            number, 'время приготовления и меры должны быть не менее 1'
+        )
+    if len(dict(amounts)) != len(amounts):
+        raise CatalogError(number, 'продукт указан повторно')
+    validate_fields(number, recipe, ('author', 'image'))
+    for _, amount in amounts:
+        validate_fields(
+            number, IngredientRecipe(amount=amount), ('ingredient', 'recipe')
+        )
+    image = None
+    if record.get('image'):
+        image = decode_image(number, record['image'])
+    return recipe, tag_ids, amounts, image
+
+
+def change_recipes_counts(recipes):
+    """Прибавляет авторам число созданных рецептов: bulk_create
+    не вызывает сигналы, которые обновляют счётчики."""
+    authors_by_count = defaultdict(list)
+    for author_id, count in Counter(
+        recipe.author_id for recipe in recipes
+    ).items():
+        authors_by_count[count].append(author_id)
+    for count, author_ids in authors_by_count.items():
+        User.objects.filter(pk__in=author_ids).update(
+            recipes_count=F('recipes_count') + count
+        )
+
+
+def import_batch(records, tags, ingredients):
+    """Сохраняет пачку рецептов. Если пачка не сохранилась,
+    удаляет уже записанные файлы её картинок."""
+    authors = User.objects.in_bulk(
+        {str(record.get('author')) for _, record in records},
+        field_name='username'
+    )
+    rows = [
+        build_recipe(number, record, authors, tags, ingredients)
+        for number, record in records
+    ]
+    saved_images = []
+    try:
+        with transaction.atomic():
+            for recipe, _, _, image in rows:
+                if image is not None:
+                    recipe.image.save(image.name, image, save=False)
+                    saved_images.append(recipe.image)
+            recipes = Recipe.objects.bulk_create(
+                recipe for recipe, _, _, _ in rows
+            )
+            RecipeTag.objects.bulk_create(
+                RecipeTag(recipe=recipe, tag_id=tag_id)
+                for recipe, tag_ids, _, _ in rows for tag_id in set(tag_ids)
+            )
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount
+                )
+                for recipe, _, amounts, _ in rows
+                for ingredient_id, amount in amounts
+            )
+            change_recipes_counts(recipes)
+    except Exception:
+        for image in saved_images:
+            image.storage.delete(image.name)
+        raise
+
+
+def import_recipes(lines, batch_size=CATALOG_BATCH_SIZE):
+    """Загружает рецепты из строк JSON Lines и возвращает их число.
+
+    Каждая пачка из 'batch_size' рецептов сохраняется в своей
+    транзакции, поэтому при ошибке уже загруженные пачки остаются.
+    Теги и продукты должны быть в базе заранее, авторы ищутся
+    по username. Картинки сохраняются необработанными, миниатюры
+    создаёт команда process_recipe_images."""
+    tags = dict(Tag.objects.values_list('slug', 'id'))
+    ingredients = {
+        (name, measurement_unit): pk
+        for pk, name, measurement_unit in Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit'
+        )
+    }
+    records = read_records(lines)
+    count = 0
+    while batch := list(islice(records, batch_size)):
+        import_batch(batch, tags, ingredients)
+        count += len(batch)
+    return count
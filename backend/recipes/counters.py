@@ -0,0 +1,39 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+# Счётчик: (модель со счётчиком, поле счётчика,
+#           модель связей, поле связи с моделью счётчика).
+COUNTERS = (
+    ('recipes.Recipe', 'favorites_count', 'recipes.Favorite', 'recipe'),
+    ('recipes.Recipe', 'shoplist_count', 'recipes.Shoplist', 'recipe'),
+    ('recipes.User', 'recipes_count', 'recipes.Recipe', 'author'),
+    ('recipes.User', 'followers_count', 'recipes.Follow', 'following'),
+    ('recipes.User', 'following_count', 'recipes.Follow', 'user'),
+)
+
+
+def change_counters(instance, delta):
+    """Изменяет на 'delta' все счётчики, которые учитывают 'instance'."""
+    for model, field, related_model, relation in COUNTERS:
+        if related_model != instance._meta.label:
+            continue
+        instance._meta.get_field(relation).related_model.objects.filter(
+            pk=getattr(instance, f'{relation}_id')
+        ).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def recount_counters(apps):
+    """Пересчитывает все счётчики по таблицам связей."""
+    for model, field, related_model, relation in COUNTERS:
+        model = apps.get_model(model)
+        related_model = apps.get_model(related_model)
+        model.objects.update(**{field: Coalesce(
+            Subquery(
+                related_model.objects.filter(
+                    **{relation: OuterRef('pk')}
+                ).order_by().values(relation).annotate(
+                    total=Count('pk')
+                ).values('total')
+            ),
+            0
+        )})
@@ -0,0 +1,79 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Расширение файла для каждого поддерживаемого формата.
+IMAGE_EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg'}
+
+
+def thumbnail_name(name, size):
+    """Имя файла миниатюры 'size' рядом с картинкой 'name'."""
+    root, extension = os.path.splitext(name)
+    return f'{root}_{size}{extension}'
+
+
+def encode_image(image, max_size):
+    """Уменьшает картинку до 'max_size' и сжимает её
+    в формат IMAGE_FORMAT."""
+    image = image.copy()
+    image.thumbnail(max_size, Image.LANCZOS)
+    if settings.IMAGE_FORMAT == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+        image = image.convert(
+            'RGBA'
+            if settings.IMAGE_FORMAT != 'JPEG' and 'A' in image.getbands()
+            else 'RGB'
+        )
+    content = BytesIO()
+    image.save(
+        content,
+        settings.IMAGE_FORMAT,
+        quality=settings.IMAGE_QUALITY,
+        optimize=True
+    )
+    return ContentFile(content.getvalue())
+
+
+def save_file(storage, name, content):
+    """Сохраняет файл под именем 'name', заменяя существующий."""
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, content)
+
+
+def process_image(field_file):
+    """Ограничивает размер картинки, пересжимает её и сохраняет
+    рядом миниатюры всех размеров из IMAGE_THUMBNAIL_SIZES.
+
+    Исходный файл не трогает: результат пишется под новым именем,
+    которое и возвращается. Если обработка не удалась, уже
+    записанные файлы удаляются."""
+    storage = field_file.storage
+    with field_file.open('rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    name = storage.save(
+        os.path.splitext(field_file.name)[0]
+        + IMAGE_EXTENSIONS[settings.IMAGE_FORMAT],
+        encode_image(image, settings.IMAGE_MAX_SIZE)
+    )
+    try:
+        for size, max_size in settings.IMAGE_THUMBNAIL_SIZES.items():
+            save_file(
+                storage,
+                thumbnail_name(name, size),
+                encode_image(image, max_size)
+            )
+    except Exception:
+        delete_image(storage, name)
+        raise
+    return name
+
+
+def delete_image(storage, name):
+    """Удаляет картинку 'name' вместе с её миниатюрами."""
+    storage.delete(name)
+    for size in settings.IMAGE_THUMBNAIL_SIZES:
+        storage.delete(thumbnail_name(name, size))
@@ -0,0 +1,134 @@
+from timeit import repeat
+
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import (Ingredient, IngredientRecipe, Recipe, Shoplist,
+                            ShoplistIngredient, User)
+
+SIZES = (10, 100, 1000)
+INGREDIENTS_COUNT = 300
+INGREDIENTS_PER_RECIPE = 8
+ROW = '{:>7} {:>22} {:>22} {:>22}'
+RESULT = '{} строк, {:.2f} ms'
+
+
+def old_shopping_list(user):
+    """Запрос списка покупок до перехода на IngredientRecipe."""
+    return user.shoplists.values(
+        'recipe__ingredients__name',
+        'recipe__ingredients__measurement_unit',
+    ).annotate(amount=Sum('recipe__amounts__amount'))
+
+
+def aggregated_shopping_list(user):
+    """Сумма по IngredientRecipe рецептов из списка покупок."""
+    return IngredientRecipe.objects.filter(
+        recipe__in=user.shoplists.values('recipe')
+    ).values(
+        'ingredient_id',
+        'ingredient__name',
+        'ingredient__measurement_unit',
+    ).annotate(amount=Sum('amount')).order_by('ingredient__name')
+
+
+# Запрос, число строк, которые он соединяет.
+QUERIES = (
+    (
+        old_shopping_list,
+        lambda user: user.shoplists.values(
+            'recipe__ingredients__name', 'recipe__amounts__amount'
+        ).count()
+    ),
+    (
+        aggregated_shopping_list,
+        lambda user: IngredientRecipe.objects.filter(
+            recipe__in=user.shoplists.values('recipe')
+        ).count()
+    ),
+    (
+        ShoplistIngredient.ingredients_in_shoplist,
+        lambda user: user.shoplist_ingredients.count()
+    ),
+)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает запросы списка покупок: прежний, сумму '
+            'по IngredientRecipe и готовые итоги ShoplistIngredient. '
+            'Данные создаются во временной транзакции и откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('sizes', nargs='*', type=int, default=SIZES)
+        parser.add_argument('--number', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def create_shoplist(self, size):
+        """Пользователь, в списке покупок которого 'size' рецептов
+        по INGREDIENTS_PER_RECIPE продуктов."""
+        user = User.objects.create_user(
+            email=f'benchmark{size}@example.com',
+            username=f'benchmark{size}',
+            first_name='Benchmark',
+            last_name=str(size)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Продукт {size}-{number}', measurement_unit='г')
+            for number in range(INGREDIENTS_COUNT)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=user,
+                name=f'Рецепт {number}',
+                image='recipes/images/benchmark.png',
+                text='Рецепт для замера',
+                cooking_time=1
+            ) for number in range(size)
+        )
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe,
+                ingredient=ingredients[
+                    (number * INGREDIENTS_PER_RECIPE + index)
+                    % INGREDIENTS_COUNT
+                ],
+                amount=index + 1
+            )
+            for number, recipe in enumerate(recipes)
+            for index in range(INGREDIENTS_PER_RECIPE)
+        )
+        Shoplist.objects.bulk_create(
+            Shoplist(user=user, recipe=recipe) for recipe in recipes
+        )
+        ShoplistIngredient.objects.bulk_create(
+            ShoplistIngredient(
+                user=user,
+                ingredient_id=row['ingredient_id'],
+                amount=row['amount']
+            ) for row in aggregated_shopping_list(user)
+        )
+        return user
+
+    def measure(self, query, user, options):
+        """Лучшее время выполнения запроса в миллисекундах."""
+        return min(repeat(
+            lambda: list(query(user)),
+            number=options['number'],
+            repeat=options['repeat']
+        )) / options['number'] * 1000
+
+    def handle(self, *args, **options):
+        print(ROW.format(
+            'Рецепты', 'Прежний запрос', 'IngredientRecipe',
+            'ShoplistIngredient'
+        ))
+        with transaction.atomic():
+            for size in options['sizes']:
+                user = self.create_shoplist(size)
+                print(ROW.format(size, *(
+                    RESULT.format(
+                        count_rows(user), self.measure(query, user, options)
+                    ) for query, count_rows in QUERIES
+                )))
+            transaction.set_rollback(True)
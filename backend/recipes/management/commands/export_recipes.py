@@ -0,0 +1,20 @@
+from django.core.management import BaseCommand
+
+from recipes.catalog import export_recipes
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Выгружает рецепты в файл JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--no-images', action='store_true')
+
+    def handle(self, *args, **options):
+        print('Рецепты выгружаются ... ')
+        with open(options['path'], 'w', encoding='utf-8') as catalog:
+            catalog.writelines(export_recipes(
+                Recipe.objects.all(), with_images=not options['no_images']
+            ))
+        print('Выгрузка рецептов завершилась успешно!')
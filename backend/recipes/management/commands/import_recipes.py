@@ -0,0 +1,28 @@
+from django.core.management import BaseCommand, CommandError
+
+from api.cache import FEED_VERSION, bump_version
+from recipes.catalog import CATALOG_BATCH_SIZE, CatalogError, import_recipes
+
+
+class Command(BaseCommand):
+    help = 'Загружает рецепты из файла JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--batch-size', type=int, default=CATALOG_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        print('Рецепты загружаются ... ')
+        try:
+            with open(options['path'], 'r', encoding='utf-8') as catalog:
+                count = import_recipes(catalog, options['batch_size'])
+        except FileNotFoundError:
+            raise CommandError('Файл с рецептами не найден')
+        except CatalogError as error:
+            raise CommandError(error)
+        finally:
+            bump_version(FEED_VERSION)
+        print(f'Загружено рецептов: {count}. '
+              'Миниатюры создаст команда process_recipe_images.')
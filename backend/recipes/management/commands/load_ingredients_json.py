@@ -2,6 +2,7 @@ import json
 
 from django.core.management.base import BaseCommand, CommandError
 
+from api.cache import bump_reference_version
 from recipes.models import Ingredient
 
 
@@ -19,6 +20,7 @@ class Command(BaseCommand):
                     measurement_unit=row['measurement_unit']
                 ) for row in data
             )
+            bump_reference_version(Ingredient)
             print('Загрузка ингредиентов завершилась успешно!')
         except FileNotFoundError:
             raise CommandError('Файл с ингредиентами не найден')
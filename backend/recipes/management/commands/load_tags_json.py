@@ -2,6 +2,7 @@ import json
 
 from django.core.management import BaseCommand, CommandError
 
+from api.cache import bump_reference_version
 from recipes.models import Tag
 
 
@@ -18,6 +19,7 @@ class Command(BaseCommand):
                     slug=row['slug']
                 ) for row in data
             )
+            bump_reference_version(Tag)
             print('Загрузка тегов завершилась успешно!')
         except FileNotFoundError:
             raise CommandError('Файл с тегами не найден')
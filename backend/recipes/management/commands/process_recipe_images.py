@@ -0,0 +1,20 @@
+from django.core.management import BaseCommand
+
+from recipes.models import IMAGE_READY, Recipe
+
+
+class Command(BaseCommand):
+    help = ('Пересжимает картинки рецептов и создаёт миниатюры. '
+            'По умолчанию - только ещё не обработанные.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true')
+
+    def handle(self, *args, **options):
+        print('Картинки рецептов обрабатываются ... ')
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.exclude(image_status=IMAGE_READY)
+        for recipe in recipes.iterator():
+            recipe.process_image()
+        print('Обработка картинок завершилась успешно!')
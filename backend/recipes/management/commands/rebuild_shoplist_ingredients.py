@@ -0,0 +1,34 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import IngredientRecipe, ShoplistIngredient
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает итоги списков покупок всех пользователей.'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        print('Итоги списков покупок пересчитываются ... ')
+        ShoplistIngredient.objects.all().delete()
+        totals = IngredientRecipe.objects.filter(
+            recipe__shoplists__isnull=False
+        ).values(
+            'recipe__shoplists__user', 'ingredient'
+        ).annotate(
+            total=Sum('amount')
+        ).order_by()
+        ShoplistIngredient.objects.bulk_create(
+            (
+                ShoplistIngredient(
+                    user_id=row['recipe__shoplists__user'],
+                    ingredient_id=row['ingredient'],
+                    amount=row['total']
+                ) for row in totals.iterator()
+            ),
+            batch_size=BATCH_SIZE
+        )
+        print('Пересчёт итогов списков покупок завершился успешно!')
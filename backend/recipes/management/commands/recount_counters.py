@@ -0,0 +1,15 @@
+from django.apps import apps
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики рецептов и пользователей.'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        print('Счётчики пересчитываются ... ')
+        recount_counters(apps)
+        print('Пересчёт счётчиков завершился успешно!')
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.models import RecipePopularity
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинг популярных рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.POPULAR_RECIPES_DAYS
+        )
+        parser.add_argument(
+            '--limit', type=int, default=settings.POPULAR_RECIPES_LIMIT
+        )
+
+    def handle(self, *args, **options):
+        print('Рейтинг популярных рецептов пересчитывается ... ')
+        RecipePopularity.refresh(options['days'], options['limit'])
+        print('Пересчёт рейтинга завершился успешно!')
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.4 on 2026-10-17 22:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_recipe_pub_date_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoplistIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(default=0, verbose_name='Мера')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shoplist_ingredients', to='recipes.ingredient', verbose_name='Продукт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shoplist_ingredients', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Продукт в списке покупок',
+                'verbose_name_plural': 'Продукты в списках покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoplistingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shoplist_ingredient'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+INDEX_NAME = 'recipe_search_vector_idx'
+CREATE_INDEX = (
+    f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON recipes_recipe USING gin '
+    "(to_tsvector('russian'::regconfig, "
+    "COALESCE(name, '') || ' ' || COALESCE(text, '')))"
+)
+DROP_INDEX = f'DROP INDEX IF EXISTS {INDEX_NAME}'
+
+
+def run_on_postgresql(sql):
+    """Индекс полнотекстового поиска есть только на PostgreSQL,
+    на SQLite миграция ничего не делает."""
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_shoplistingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgresql(CREATE_INDEX),
+            run_on_postgresql(DROP_INDEX),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.4 on 2026-10-17 22:19
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# Счётчики на момент этой миграции: (модель со счётчиком, поле счётчика,
+#                                    модель связей, поле связи).
+COUNTERS = (
+    ('recipes.Recipe', 'favorites_count', 'recipes.Favorite', 'recipe'),
+    ('recipes.Recipe', 'shoplist_count', 'recipes.Shoplist', 'recipe'),
+    ('recipes.User', 'recipes_count', 'recipes.Recipe', 'author'),
+    ('recipes.User', 'followers_count', 'recipes.Follow', 'following'),
+    ('recipes.User', 'following_count', 'recipes.Follow', 'user'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for model, field, related_model, relation in COUNTERS:
+        related_model = apps.get_model(related_model)
+        apps.get_model(model).objects.update(**{field: Coalesce(
+            Subquery(
+                related_model.objects.filter(
+                    **{relation: OuterRef('pk')}
+                ).order_by().values(relation).annotate(
+                    total=Count('pk')
+                ).values('total')
+            ),
+            0
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shoplist_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число подписок'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число рецептов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
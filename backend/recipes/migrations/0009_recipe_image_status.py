@@ -0,0 +1,18 @@
+# Generated by Django 4.2.4 on 2026-10-17 22:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipepopularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status',
+            field=models.CharField(choices=[('pending', 'Обрабатывается'), ('ready', 'Готова'), ('failed', 'Ошибка')], default='pending', editable=False, max_length=10, verbose_name='Обработка картинки'),
+        ),
+    ]
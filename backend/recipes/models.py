@@ -1,17 +1,53 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, RegexValidator
-from django.db import models
-from django.db.models import Sum
+from django.db import models, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from recipes.images import delete_image, process_image, thumbnail_name
 
 INFO_ABOUT_INGREDIENT = '{ingredient} - {amount} {measurement_unit}'
 INFO_ABOUT_RECIPE = 'Рецепт: {name:.15}, Автор: {author}'
 RECIPE_IN_FAVORITES = 'Рецепт "{recipe:15}" в избранном у пользователя: {user}'
 SHOPLIST = 'Список покупок: {recipe:30} пользователя: {user}'
 SUBSCRIPTION = 'Пользователь {user} подписался на {author}'
-
-
-class User(AbstractUser):
+RECIPE_SEARCH_CONFIG = 'russian'
+RECIPE_TAG = 'Рецепт "{recipe:15}" с тегом {tag}'
+SHOPLIST_INGREDIENT = '{ingredient} - {amount} {measurement_unit} у {user}'
+RECIPE_POPULARITY = '{rank}. {recipe:.15} ({score})'
+FAVORITE_SCORE = 2
+SHOPLIST_SCORE = 1
+IMAGE_PENDING = 'pending'
+IMAGE_READY = 'ready'
+IMAGE_FAILED = 'failed'
+IMAGE_STATUSES = (
+    (IMAGE_PENDING, 'Обрабатывается'),
+    (IMAGE_READY, 'Готова'),
+    (IMAGE_FAILED, 'Ошибка'),
+)
+
+
+class CountersMixin:
+    """Поля-счётчики из 'COUNTER_FIELDS' меняются только выражениями
+    F() и не перезаписываются при сохранении загруженного объекта."""
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CountersMixin, AbstractUser):
     """Модель пользователя."""
     email = models.EmailField(
         unique=True,
@@ -31,6 +67,22 @@ class User(AbstractUser):
         max_length=150,
         verbose_name='Фамилия',
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число рецептов',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число подписчиков',
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число подписок',
+    )
+    COUNTER_FIELDS = ('recipes_count', 'followers_count', 'following_count')
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = [
         'username',
@@ -138,7 +190,7 @@ class Ingredient(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(CountersMixin, models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -153,6 +205,13 @@ class Recipe(models.Model):
         upload_to=settings.IMAGE_PLACEMENT,
         verbose_name='Картинка'
     )
+    image_status = models.CharField(
+        max_length=10,
+        choices=IMAGE_STATUSES,
+        default=IMAGE_PENDING,
+        editable=False,
+        verbose_name='Обработка картинки'
+    )
     text = models.TextField(
         verbose_name='Описание'
     )
@@ -162,6 +221,7 @@ class Recipe(models.Model):
     )
     tags = models.ManyToManyField(
         Tag,
+        through='RecipeTag',
         related_name='recipes',
         verbose_name='Теги'
     )
@@ -173,9 +233,30 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    shoplist_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
+    COUNTER_FIELDS = ('favorites_count', 'shoplist_count')
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'],
+                name='recipe_pub_date_id_idx',
+            ),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -185,6 +266,73 @@ class Recipe(models.Model):
             author=self.author.username
         )
 
+    def image_name(self, size=None):
+        """Имя файла картинки или её миниатюры размера 'size'.
+        Пока миниатюры не готовы, отдаётся сама картинка."""
+        if size is None or self.image_status != IMAGE_READY:
+            return self.image.name
+        return thumbnail_name(self.image.name, size)
+
+    def process_image(self):
+        """Пересжимает загруженную картинку и создаёт миниатюры.
+
+        Исходный файл удаляется только после того, как запись
+        рецепта указывает на обработанный. Если обработка не удалась,
+        остаётся исходная картинка со статусом 'failed'. Если за время
+        обработки картинку рецепта заменили, результат удаляется:
+        новую картинку обработает своё задание."""
+        name = self.image.name
+        storage = self.image.storage
+        try:
+            processed_name = process_image(self.image)
+            status = IMAGE_READY
+        except Exception:
+            processed_name = name
+            status = IMAGE_FAILED
+        with transaction.atomic():
+            replaced = not type(self).objects.select_for_update().filter(
+                pk=self.pk, image=name
+            ).exists()
+            if not replaced:
+                self.image.name = processed_name
+                self.image_status = status
+                self.save(
+                    update_fields=('image', 'image_status', 'updated_at')
+                )
+        if replaced:
+            if processed_name != name:
+                delete_image(storage, processed_name)
+        elif processed_name != name:
+            delete_image(storage, name)
+
+
+class RecipeTag(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт'
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        verbose_name='Тег'
+    )
+
+    class Meta:
+        db_table = 'recipes_recipe_tags'
+        verbose_name = 'Тег рецепта'
+        verbose_name_plural = 'Теги рецептов'
+        unique_together = ('recipe', 'tag')
+        indexes = [
+            models.Index(
+                fields=['tag', 'recipe'],
+                name='recipe_tag_tag_recipe_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return RECIPE_TAG.format(recipe=self.recipe.name, tag=self.tag.name)
+
 
 class IngredientRecipe(models.Model):
     ingredient = models.ForeignKey(
@@ -231,6 +379,11 @@ class BaseUserRecipe(models.Model):
         Recipe,
         on_delete=models.CASCADE
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата добавления'
+    )
 
     class Meta:
         abstract = True
@@ -275,13 +428,148 @@ class Shoplist(BaseUserRecipe):
         recipes = user.shoplists.values('recipe__name')
         return recipes
 
+
+class ShoplistIngredient(models.Model):
+    """Суммарное количество продукта в списке покупок пользователя.
+
+    Обновляется при изменении списка покупок и ингредиентов рецептов,
+    полностью пересчитывается командой 'rebuild_shoplist_ingredients'."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shoplist_ingredients',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shoplist_ingredients',
+        verbose_name='Продукт'
+    )
+    amount = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Мера'
+    )
+
+    class Meta:
+        verbose_name = 'Продукт в списке покупок'
+        verbose_name_plural = 'Продукты в списках покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shoplist_ingredient',
+            )
+        ]
+
+    def __str__(self):
+        return SHOPLIST_INGREDIENT.format(
+            ingredient=self.ingredient.name,
+            amount=self.amount,
+            measurement_unit=self.ingredient.measurement_unit,
+            user=self.user.username
+        )
+
     @classmethod
     def ingredients_in_shoplist(cls, user):
-        return user.shoplists.values(
-            'recipe__ingredients__name',
-            'recipe__ingredients__measurement_unit',
-        ).annotate(
-            amount=Sum(
-                'recipe__amounts__amount'
+        return user.shoplist_ingredients.values(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'amount',
+        ).order_by('ingredient__name')
+
+    @classmethod
+    def change_amounts(cls, user_ids, amounts):
+        """Прибавляет к итогам пользователей 'user_ids' изменения
+        'amounts' вида {id продукта: изменение количества}."""
+        amounts = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items() if amount
+        }
+        if not user_ids or not amounts:
+            return
+        ingredients_by_amount = defaultdict(list)
+        for ingredient_id, amount in amounts.items():
+            ingredients_by_amount[amount].append(ingredient_id)
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                (
+                    cls(user_id=user_id, ingredient_id=ingredient_id)
+                    for user_id in user_ids for ingredient_id in amounts
+                ),
+                ignore_conflicts=True
             )
+            for amount, ingredient_ids in ingredients_by_amount.items():
+                cls.objects.filter(
+                    user_id__in=user_ids,
+                    ingredient_id__in=ingredient_ids
+                ).update(amount=Greatest(F('amount') + amount, 0))
+            cls.objects.filter(
+                user_id__in=user_ids, amount=0
+            ).delete()
+
+    @classmethod
+    def change_recipe(cls, user_ids, recipe_id, sign=1):
+        """Добавляет (sign=1) или убирает (sign=-1) продукты рецепта
+        из итогов списков покупок пользователей 'user_ids'."""
+        cls.change_amounts(user_ids, {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in IngredientRecipe.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('ingredient_id', 'amount')
+        })
+
+
+class RecipePopularity(models.Model):
+    """Место рецепта в рейтинге популярности.
+
+    Рейтинг считается по добавлениям в избранное и списки покупок
+    за последние дни и обновляется командой 'refresh_popular_recipes'."""
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='popularity',
+        verbose_name='Рецепт'
+    )
+    score = models.PositiveIntegerField(
+        verbose_name='Баллы'
+    )
+    rank = models.PositiveIntegerField(
+        db_index=True,
+        verbose_name='Место'
+    )
+
+    class Meta:
+        ordering = ('rank',)
+        verbose_name = 'Популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+
+    def __str__(self):
+        return RECIPE_POPULARITY.format(
+            rank=self.rank,
+            recipe=self.recipe.name,
+            score=self.score
         )
+
+    @classmethod
+    def refresh(cls, days, limit):
+        """Пересчитывает рейтинг по активности за 'days' дней,
+        сохраняет 'limit' лучших рецептов."""
+        since = timezone.now() - timedelta(days=days)
+        scores = Counter()
+        for model, score in ((Favorite, FAVORITE_SCORE),
+                             (Shoplist, SHOPLIST_SCORE)):
+            for recipe_id, count in model.objects.filter(
+                created__gte=since
+            ).values('recipe').annotate(
+                total=Count('pk')
+            ).values_list('recipe', 'total').order_by():
+                scores[recipe_id] += count * score
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                cls(recipe_id=recipe_id, score=score, rank=rank)
+                for rank, (recipe_id, score) in enumerate(
+                    scores.most_common(limit), start=1
+                )
+            )
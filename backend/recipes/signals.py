@@ -0,0 +1,76 @@
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from recipes.counters import change_counters
+from recipes.models import (Favorite, Follow, IngredientRecipe, Recipe,
+                            Shoplist, ShoplistIngredient)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=Shoplist)
+@receiver(post_save, sender=Follow)
+@receiver(post_save, sender=Recipe)
+def increase_counters(sender, instance, created, **kwargs):
+    if created:
+        change_counters(instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=Shoplist)
+@receiver(post_delete, sender=Follow)
+@receiver(post_delete, sender=Recipe)
+def decrease_counters(sender, instance, **kwargs):
+    change_counters(instance, -1)
+
+
+@receiver(post_save, sender=Shoplist)
+def add_to_shoplist_ingredients(sender, instance, created, **kwargs):
+    if created:
+        ShoplistIngredient.change_recipe(
+            [instance.user_id], instance.recipe_id
+        )
+
+
+@receiver(post_delete, sender=Shoplist)
+def remove_from_shoplist_ingredients(sender, instance, **kwargs):
+    """При каскадном удалении рецепта его продукты к этому моменту
+    могут быть уже удалены и учтены сигналом IngredientRecipe."""
+    ShoplistIngredient.change_recipe(
+        [instance.user_id], instance.recipe_id, sign=-1
+    )
+
+
+def change_shoplists_of_recipe(recipe_id, amounts):
+    ShoplistIngredient.change_amounts(
+        list(Shoplist.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True)),
+        amounts
+    )
+
+
+@receiver(pre_save, sender=IngredientRecipe)
+def remember_ingredient_amount(sender, instance, **kwargs):
+    instance.saved_amount = instance.pk and IngredientRecipe.objects.filter(
+        pk=instance.pk
+    ).values_list('ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=IngredientRecipe)
+def change_ingredient_amount(sender, instance, **kwargs):
+    """Переносит в списки покупок правку меры продукта рецепта,
+    в том числе сделанную в админке."""
+    amounts = Counter({instance.ingredient_id: instance.amount})
+    if instance.saved_amount:
+        ingredient_id, amount = instance.saved_amount
+        amounts.subtract({ingredient_id: amount})
+    change_shoplists_of_recipe(instance.recipe_id, amounts)
+
+
+@receiver(post_delete, sender=IngredientRecipe)
+def remove_ingredient_amount(sender, instance, **kwargs):
+    change_shoplists_of_recipe(
+        instance.recipe_id, {instance.ingredient_id: -instance.amount}
+    )
@@ -0,0 +1,40 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+# Pillow отпускает GIL при декодировании, масштабировании и сжатии,
+# поэтому потоки разгружают обработчик запроса не хуже процессов.
+image_executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+    thread_name_prefix='recipe-images'
+)
+
+
+def process_recipe_image(recipe_id):
+    """Обрабатывает картинку рецепта в фоновом потоке."""
+    try:
+        Recipe.objects.get(pk=recipe_id).process_image()
+    except Recipe.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception(
+            'Не удалось обработать картинку рецепта %s', recipe_id
+        )
+    finally:
+        connection.close()
+
+
+def submit_recipe_image(recipe_id):
+    """Ставит обработку картинки в очередь после фиксации транзакции.
+
+    Если процесс остановится раньше, чем очередь опустеет,
+    необработанные картинки догонит команда process_recipe_images."""
+    transaction.on_commit(
+        lambda: image_executor.submit(process_recipe_image, recipe_id)
+    )